@@ -0,0 +1,168 @@
+"""
+Batch-Bewertung großer Standortkataloge in zwei Stufen.
+
+1. E/A: NDVI kommt aus dem lokalen Würfel (live nur für Standorte ohne
+   aktuellen Würfelwert), das Wetter aus Open-Meteo-Sammelanfragen mit
+   bis zu `BATCH_SIZE` Koordinaten. Die Anfragen laufen in einigen
+   Threads des Hauptprozesses, damit ein einziger Scheduler das volle
+   Request-Budget pro Host nutzt.
+2. Rechnen: Die Antwort-Bodies werden blockweise auf Worker-Prozesse
+   verteilt, die dekodieren, aggregieren und klassifizieren und ihre
+   Ergebnisse direkt in ein gemeinsames Shared-Memory-Array (Standort ×
+   Kennzahl) schreiben. Die Worker stellen selbst keine Anfragen.
+
+Aufruf:
+    python batch_scoring.py --workers 8 --out scores.csv
+
+Zusätzlich wird jeder Lauf als Snapshot gespeichert (siehe `snapshots.py`).
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import scheduler
+from indicators import BATCH_SIZE, WEATHER_PARAMS, batch_weather, decode_batch, fetch_batch_raw, get_site_ndvi
+from ndvi_cube import open_default_cube
+from risk_model import (
+    COLUMNS, NO_DATA, drought_risk_array, flood_risk_array, risk_labels, total_risk_0_1, veg_risk_array,
+)
+from sites import DEFAULT_SITES_FILE, load_registry
+from snapshots import write_snapshot
+
+IO_THREADS = 8  # gleichzeitige Upstream-Anfragen; das Rate-Limit setzt der Scheduler durch
+
+_worker = {}
+
+
+# -----------------------------------------------------------
+# STUFE 1: E/A
+# -----------------------------------------------------------
+def _site_ndvi(registry, cube, i):
+    site_id = registry.ids[i]
+    latest = get_site_ndvi(site_id, *registry.coords(site_id), cube, scheduler.BATCH)
+    return np.nan if latest is None else latest[1]
+
+
+def _fetch_weather(registry, bounds):
+    """Antwort-Body der Sammelanfrage für Standorte [start, stop) oder None."""
+    start, stop = bounds
+    try:
+        return fetch_batch_raw(registry.lat[start:stop], registry.lon[start:stop], WEATHER_PARAMS)
+    except Exception:
+        return None
+
+
+def fetch_inputs(registry, chunks, cube=None, threads=IO_THREADS):
+    """
+    NDVI je Standort (NaN = kein Wert) und ein Antwort-Body (oder None
+    bei Fehlschlag) je Block aus `chunks`.
+    """
+    with ThreadPoolExecutor(threads) as pool:
+        ndvi = np.array(list(pool.map(lambda i: _site_ndvi(registry, cube, i), range(len(registry)))), dtype=np.float64)
+        bodies = list(pool.map(lambda bounds: _fetch_weather(registry, bounds), chunks))
+    return ndvi, bodies
+
+
+# -----------------------------------------------------------
+# STUFE 2: WORKER (nur CPU)
+# -----------------------------------------------------------
+def score_block(body, ndvi, cfg):
+    """
+    Kennzahlen (Zeilen wie `COLUMNS`) für einen Block aus dem Antwort-Body
+    der Sammelanfrage, dem NDVI je Standort (NaN → `ndvi_min`) und den
+    Schwellenwerten `cfg` (Spalten wie `SiteRegistry.configs()`).
+    """
+    drought, p1h, p3h, p24h = batch_weather(decode_batch(body))
+    ndvi = np.where(np.isnan(ndvi), cfg["ndvi_min"], ndvi)
+
+    veg_risk = veg_risk_array(ndvi, cfg)
+    drought_risk = np.where(np.isnan(drought), np.nan, drought_risk_array(drought, cfg))
+    flood_risk = np.where(np.isnan(p3h) | np.isnan(p24h), np.nan, flood_risk_array(p3h, p24h, cfg))
+    total = total_risk_0_1(veg_risk, drought_risk, flood_risk)
+    return np.column_stack([ndvi, drought, p1h, p3h, p24h, veg_risk, drought_risk, flood_risk, total])
+
+
+def _init_worker(shm_name, n_sites, sites_file):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm  # Referenz halten, sonst wird der Puffer freigegeben
+    # Spalte 0 enthält beim Start den NDVI aus Stufe 1, danach das Ergebnis
+    _worker["results"] = np.ndarray((n_sites, len(COLUMNS)), dtype=np.float64, buffer=shm.buf)
+    _worker["registry"] = load_registry(sites_file)
+
+
+def _score_chunk(task):
+    """Standorte [start, stop) aus dem Antwort-Body bewerten; liefert die Anzahl Fehlschläge."""
+    (start, stop), body = task
+    out = _worker["results"][start:stop]
+    cfg = {key: col[start:stop].astype(np.float64) for key, col in _worker["registry"].configs().items()}
+    try:
+        out[:] = score_block(body, out[:, 0].copy(), cfg)
+    except Exception:
+        out[:] = np.nan
+        return stop - start
+    return int(np.isnan(out[:, -1]).sum())
+
+
+# -----------------------------------------------------------
+# STEUERUNG
+# -----------------------------------------------------------
+def score_all(sites_file=DEFAULT_SITES_FILE, workers=None, chunk_size=BATCH_SIZE):
+    """
+    Alle Standorte bewerten. Liefert ein DataFrame mit `site_id`, den
+    Kennzahlen aus `COLUMNS`, `total_score` (0–100) und `label`.
+    Fehlgeschlagene Standorte enthalten NaN.
+    """
+    registry = load_registry(sites_file)
+    n = len(registry)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = min(chunk_size, BATCH_SIZE)
+    chunks = [(s, min(s + chunk_size, n)) for s in range(0, n, chunk_size)]
+
+    ndvi, bodies = fetch_inputs(registry, chunks, open_default_cube())
+    failed = sum(stop - start for (start, stop), body in zip(chunks, bodies) if body is None)
+    tasks = [(bounds, body) for bounds, body in zip(chunks, bodies) if body is not None]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n * len(COLUMNS) * 8))
+    try:
+        results = np.ndarray((n, len(COLUMNS)), dtype=np.float64, buffer=shm.buf)
+        results[:] = np.nan
+        for (start, stop), body in zip(chunks, bodies):
+            if body is not None:  # Standorte ohne Wetterdaten bleiben vollständig leer
+                results[start:stop, 0] = ndvi[start:stop]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shm.name, n, sites_file),
+        ) as pool:
+            failed += sum(pool.map(_score_chunk, tasks))
+        df = pd.DataFrame(results.copy(), columns=list(COLUMNS))
+        del results
+    finally:
+        shm.close()
+        shm.unlink()
+
+    df.insert(0, "site_id", registry.ids.astype(str))
+    df["total_score"] = (df["total_risk"] * 100).round()
+    df["label"] = risk_labels(df["total_score"], na_label=NO_DATA)
+    df.attrs["failed"] = failed
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Risiko-Scores für alle Standorte parallel berechnen.")
+    parser.add_argument("--sites", default=DEFAULT_SITES_FILE, help="Standort-CSV")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=BATCH_SIZE, help=f"Standorte je Sammelanfrage (max. {BATCH_SIZE})")
+    parser.add_argument("--out", default="scores.csv")
+    parser.add_argument("--no-snapshot", action="store_true", help="keinen Snapshot schreiben")
+    args = parser.parse_args()
+
+    scores = score_all(args.sites, args.workers, args.chunk_size)
+    scores.to_csv(args.out, index=False)
+    print(f"{len(scores)} Standorte bewertet, {scores.attrs['failed']} fehlgeschlagen → {args.out}")
+    if not args.no_snapshot:
+        print(f"Snapshot: {write_snapshot(scores)}")
@@ -0,0 +1,314 @@
+"""
+Speicherbegrenzter Prozess-Cache für Upstream-Antworten und berechnete Daten.
+
+Alle Einträge werden mit ihrer Größe (Bytes) verbucht. Überschreitet die
+Summe das Budget (`NIKKI_CACHE_MAX_MB`), werden die am längsten nicht
+genutzten Einträge verdrängt (LRU); abgelaufene Einträge (TTL) fallen
+zuerst heraus. Verdrängte Einträge, die nicht ohnehin auf der Platte
+liegen, werden in ein Spill-Verzeichnis ausgelagert und beim nächsten
+Zugriff von dort zurückgeholt. Das Spill-Verzeichnis hat ein eigenes
+Budget (`NIKKI_SPILL_MAX_MB`); darüber werden die ältesten Dateien gelöscht.
+
+Zähler (Treffer, Fehlzugriffe, Verdrängungen, Bytes …) liefert `metrics()`.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAX_BYTES = int(float(os.environ.get("NIKKI_CACHE_MAX_MB", 64)) * 1024 * 1024)
+SPILL_DIR = Path(os.environ.get("NIKKI_SPILL_DIR", Path(__file__).with_name("data") / "cache" / "spill"))
+SPILL_MAX_BYTES = int(float(os.environ.get("NIKKI_SPILL_MAX_MB", 256)) * 1024 * 1024)
+SPILL_SWEEP_TARGET = 0.9  # nach dem Aufräumen höchstens 90 % des Budgets belegt
+
+MISSING = object()
+
+
+def sizeof(value):
+    """Speicherbedarf eines Cache-Werts in Bytes (Schätzung für Objekte)."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "created", "expires", "spill")
+
+    def __init__(self, value, nbytes, created, expires, spill):
+        self.value = value
+        self.nbytes = nbytes
+        self.created = created
+        self.expires = expires
+        self.spill = spill
+
+
+class CacheManager:
+    """
+    LRU/TTL-Cache mit globalem Byte-Budget.
+
+    - `put(key, value, ttl, spill=True)`: `spill=False` für Werte, die
+      bereits anderweitig auf der Platte liegen (z. B. Payload-Blobs)
+    - `get(key, max_age)`: Wert oder `MISSING`
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, spill_dir=SPILL_DIR, spill_max_bytes=SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.spill_max_bytes = spill_max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self.bytes = 0
+        self.spill_bytes = None  # erst beim ersten Auslagern aus dem Verzeichnis ermittelt
+
+        # Kennzahlen
+        self.hits = 0
+        self.misses = 0
+        self.spill_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.spills = 0
+        self.spill_removed = 0
+
+    # --- Lesen/Schreiben -------------------------------------------------
+    def get(self, key, max_age=None):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._expired(entry, now, max_age):
+                    self._remove(key)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+
+        entry = self._load_spill(key)
+        if entry is None or self._expired(entry, now, max_age):
+            with self._lock:
+                self.misses += 1
+            return MISSING
+        with self._lock:
+            self.spill_hits += 1
+        self._insert(key, entry)
+        return entry.value
+
+    def put(self, key, value, ttl=None, spill=True, created=None, nbytes=None):
+        """Wert speichern; `created` erlaubt ein älteres Alter (z. B. Datei-mtime)."""
+        created = time.time() if created is None else created
+        expires = None if ttl is None else created + ttl
+        nbytes = sizeof(value) if nbytes is None else nbytes
+        if nbytes > self.max_bytes:
+            return value  # passt nie ins Budget
+        self._insert(key, _Entry(value, nbytes, created, expires, spill))
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.spill_dir is not None:
+            self._unlink_spill(self._spill_path(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.spill_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.spill_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "spills": self.spills,
+                "spill_bytes": self.spill_bytes or 0,
+                "spill_removed": self.spill_removed,
+            }
+
+    # --- intern ----------------------------------------------------------
+    @staticmethod
+    def _expired(entry, now, max_age):
+        if entry.expires is not None and now >= entry.expires:
+            return True
+        return max_age is not None and now - entry.created > max_age
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.nbytes
+        return entry
+
+    def _insert(self, key, entry):
+        victims = []
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+            if self.bytes > self.max_bytes:
+                now = time.time()
+                # Abgelaufene zuerst, danach die ältesten Zugriffe
+                for k in [k for k, e in self._entries.items() if self._expired(e, now, None)]:
+                    self._remove(k)
+                    self.expirations += 1
+                while self.bytes > self.max_bytes:
+                    k, e = self._entries.popitem(last=False)
+                    self.bytes -= e.nbytes
+                    self.evictions += 1
+                    if e.spill and self.spill_dir is not None and not self._expired(e, now, None):
+                        victims.append((k, e))
+        # Auslagern außerhalb der Sperre (Plattenzugriff)
+        for k, e in victims:
+            self._write_spill(k, e)
+
+    def _spill_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return self.spill_dir / digest[:2] / f"{digest}.pkl"
+
+    def _write_spill(self, key, entry):
+        path = self._spill_path(key)
+        tmp = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((key, entry.value, entry.nbytes, entry.created, entry.expires), f, protocol=pickle.HIGHEST_PROTOCOL)
+            replaced = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)
+            size = path.stat().st_size
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            if tmp is not None:
+                Path(tmp).unlink(missing_ok=True)
+            return  # nicht auslagerbar → einfach verworfen
+        with self._lock:
+            self.spills += 1
+        with self._spill_lock:
+            if self.spill_bytes is None:
+                self.spill_bytes = self._spill_usage()
+            else:
+                self.spill_bytes += size - replaced
+            if self.spill_bytes > self.spill_max_bytes:
+                self._sweep_spill()
+
+    def _load_spill(self, key):
+        if self.spill_dir is None:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, value, nbytes, created, expires = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self._unlink_spill(path)
+            return None
+        self._unlink_spill(path)  # liegt ab jetzt wieder im Speicher
+        if stored_key != key:
+            return None
+        return _Entry(value, nbytes, created, expires, True)
+
+    def _spill_files(self):
+        """(mtime, Größe, Pfad) aller Spill-Dateien; gleichzeitig gelöschte fehlen."""
+        files = []
+        for path in self.spill_dir.glob("*/*.pkl"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _spill_usage(self):
+        return sum(size for _, size, _ in self._spill_files())
+
+    def _sweep_spill(self):
+        """Älteste Spill-Dateien löschen, bis das Verzeichnis unter dem Zielwert liegt (hält `_spill_lock`)."""
+        files = sorted(self._spill_files())
+        total = sum(size for _, size, _ in files)
+        target = self.spill_max_bytes * SPILL_SWEEP_TARGET
+        for _, size, path in files:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.spill_removed += 1
+        self.spill_bytes = total
+
+    def _unlink_spill(self, path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._spill_lock:
+            if self.spill_bytes is not None:
+                self.spill_bytes = max(0, self.spill_bytes - size)
+
+
+# -----------------------------------------------------------
+# PROZESSWEITER CACHE
+# -----------------------------------------------------------
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> CacheManager:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = CacheManager()
+        return _default
+
+
+def set_cache(instance: CacheManager):
+    """Prozessweiten Cache ersetzen (z. B. mit anderem Budget)."""
+    global _default
+    with _default_lock:
+        _default = instance
+
+
+def memoize(ttl, when=None):
+    """
+    Ergebnis einer Funktion im prozessweiten Cache ablegen (Schlüssel:
+    Funktionsname + Argumente). Für berechnete DataFrames/Listen.
+    Mit `when(ergebnis) -> bool` werden z. B. Fehlerergebnisse nicht gecacht.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = ("memoize", func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+            cache = get_cache()
+            value = cache.get(key)
+            if value is MISSING:
+                value = func(*args, **kwargs)
+                if when is None or when(value):
+                    cache.put(key, value, ttl=ttl)
+            return value
+        return wrapper
+    return decorator
@@ -2,6 +2,12 @@ import streamlit as st
 import requests
 import pandas as pd
 
+import payload_cache
+from et0_engine import WEATHER_VARIABLES, et0_from_open_meteo
+from risk_model import classify_drought_series
+from sites import load_registry
+from water_balance import WaterBalanceState
+
 # -----------------------------------------------------------------------------
 # Seiteneinstellungen
 # -----------------------------------------------------------------------------
@@ -11,15 +17,10 @@ st.title("💧 Referenz-Evapotranspiration ET₀ (FAO)")
 # -----------------------------------------------------------------------------
 # Standorte (Koordinaten)
 # -----------------------------------------------------------------------------
-cities = {
-    "Darmstadt, Deutschland": (49.8728, 8.6512),
-    "Malolos, Philippinen": (14.8549, 120.8100),
-    "Fortaleza, Brasilien": (-3.7319, -38.5267),
-    "Tucson, USA": (32.2226, -110.9747),
-}
+SITES = load_registry()
 
-city_name = st.selectbox("Standort auswählen", list(cities.keys()))
-lat, lon = cities[city_name]
+site_id = st.selectbox("Standort auswählen", list(SITES.ids), format_func=SITES.name)
+lat, lon = SITES.coords(site_id)
 
 st.write(f"**Koordinaten:** {lat}, {lon}")
 
@@ -34,7 +35,10 @@ url = (
     "&timezone=auto"
 )
 
-res = requests.get(url).json()
+try:
+    res = payload_cache.get_json(url)
+except requests.HTTPError as e:
+    res = {"error": str(e), "reason": e.response.text if e.response is not None else None}
 
 # -----------------------------------------------------------------------------
 # Fehlerprüfung
@@ -87,7 +91,6 @@ st.markdown(
 )
 
 import streamlit as st
-import requests
 import pandas as pd
 
 st.set_page_config(page_title="ET₀ & Dürreindex", layout="centered")
@@ -97,15 +100,8 @@ st.title("💧 Referenz-Evapotranspiration ET₀ (FAO) & Dürreindex")
 # -----------------------------
 # Standorte
 # -----------------------------
-CITIES = {
-    "Darmstadt, Deutschland": (49.8728, 8.6512),
-    "Tucson, USA": (32.2226, -110.9747),
-    "Fortaleza, Brasilien": (-3.7319, -38.5267),
-    "Malolos, Philippinen": (14.8443, 120.8114),
-}
-
-city = st.selectbox("📍 Standort auswählen", list(CITIES.keys()))
-lat, lon = CITIES[city]
+site_id = st.selectbox("📍 Standort auswählen", list(SITES.ids), format_func=SITES.name)
+lat, lon = SITES.coords(site_id)
 
 st.write(f"Koordinaten: {lat:.4f}, {lon:.4f}")
 
@@ -117,15 +113,15 @@ def fetch_et0_and_rain(lat, lon, past_days=7, forecast_days=7):
     params = {
         "latitude": lat,
         "longitude": lon,
-        "hourly": "et0_fao_evapotranspiration",
+        # Wettergrößen zusätzlich für den lokalen FAO-56-Abgleich
+        "hourly": ",".join(("et0_fao_evapotranspiration",) + WEATHER_VARIABLES),
         "daily": "precipitation_sum",
+        "wind_speed_unit": "ms",
         "timezone": "auto",
         "past_days": past_days,
         "forecast_days": forecast_days,
     }
-    r = requests.get(url, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    return payload_cache.get_json(url, params, timeout=20)
 
 with st.spinner("Lade ET₀- und Niederschlagsdaten von Open-Meteo…"):
     data = fetch_et0_and_rain(lat, lon)
@@ -140,8 +136,12 @@ df_hourly = pd.DataFrame({
 })
 df_hourly["date"] = df_hourly["time"].dt.normalize()  # nur Datum
 
+# Lokal nach FAO-56 Penman-Monteith berechnet (gleiche Antwort, kein Extra-Aufruf)
+_, et0_local = et0_from_open_meteo(data)
+df_hourly["et0_local"] = et0_local[0]
+
 df_et0_daily = (
-    df_hourly.groupby("date", as_index=False)["et0"]
+    df_hourly.groupby("date", as_index=False)[["et0", "et0_local"]]
     .sum()
     .sort_values("date")
 )
@@ -161,17 +161,7 @@ df_rain = pd.DataFrame({
 df_combined = pd.merge(df_et0_daily, df_rain, on="date", how="inner")
 df_combined["drought"] = df_combined["et0"] - df_combined["rain"]
 
-def classify_drought(x):
-    if x < 0:
-        return "🟢 Nass"
-    elif x < 1.5:
-        return "🟢 Normal"
-    elif x < 3:
-        return "🟠 Moderat"
-    else:
-        return "🔴 Stark"
-
-df_combined["status"] = df_combined["drought"].apply(classify_drought)
+df_combined["status"] = classify_drought_series(df_combined["drought"])
 
 # -----------------------------
 # 4) Charts anzeigen
@@ -203,9 +193,28 @@ st.markdown(
     f"Dürreindex: `{last['drought']:.2f} mm/Tag` → {last['status']}"
 )
 
+# Bodenwasserbilanz (fortgeschrieben von water_balance.py)
+wb_status = WaterBalanceState.load().site_status(site_id)
+if wb_status:
+    wb_storage, wb_capacity, wb_deficit, wb_date = wb_status
+    st.metric(
+        "Bodenwasserspeicher (Bucket-Modell)",
+        f"{wb_storage:.0f} / {wb_capacity:.0f} mm",
+        help=f"Stand {wb_date}. Mehrtägige Bilanz aus ET₀ und Niederschlag.",
+    )
+    st.write(f"Relatives Defizit: **{wb_deficit:.0%}**")
+
 with st.expander("🔍 Details (Tabelle)"):
     st.dataframe(df_combined.reset_index(drop=True))
 
 # --- Tabelle als Übersicht ---
 with st.expander("Details – Dürreindex"):
     st.dataframe(df_combined)
+
+with st.expander("🔬 Abgleich: ET₀ Open-Meteo vs. lokale FAO-56-Berechnung"):
+    st.line_chart(
+        df_et0_daily.set_index("date")[["et0", "et0_local"]],
+        height=250
+    )
+    diff = (df_et0_daily["et0_local"] - df_et0_daily["et0"]).abs().mean()
+    st.caption(f"Mittlere Abweichung: {diff:.2f} mm/Tag")
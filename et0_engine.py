@@ -0,0 +1,153 @@
+"""
+Lokale Referenzverdunstung ET₀ nach FAO-56 Penman-Monteith (Stundenschritt).
+
+Alle Eingaben sind NumPy-Arrays der Form (Standorte × Stunden); Zeit,
+Koordinaten und Höhe werden passend gebroadcastet. Damit lässt sich ET₀
+für archivierte oder gerasterte Wetterdaten in einem Rutsch berechnen
+und mit `et0_fao_evapotranspiration` von Open-Meteo abgleichen.
+
+Referenz: Allen et al. (1998), FAO Irrigation and Drainage Paper 56,
+Gl. 53 (stündliche Penman-Monteith-Formel) mit Gl. 28 für Ra.
+"""
+import numpy as np
+
+# Open-Meteo-Variablen, die für die Berechnung benötigt werden
+WEATHER_VARIABLES = (
+    "temperature_2m",
+    "relative_humidity_2m",
+    "wind_speed_10m",
+    "shortwave_radiation",
+)
+
+ALBEDO = 0.23
+SOLAR_CONSTANT = 0.0820          # MJ m⁻² min⁻¹
+STEFAN_BOLTZMANN_H = 2.043e-10   # MJ m⁻² h⁻¹ K⁻⁴
+NIGHT_RS_RSO = 0.7               # Rs/Rso, falls noch kein Tageswert vorliegt
+
+
+def saturation_vapour_pressure(t_c):
+    """e°(T) in kPa (Gl. 11)."""
+    return 0.6108 * np.exp(17.27 * t_c / (t_c + 237.3))
+
+
+def wind_at_2m(u_z, height=10.0):
+    """Windgeschwindigkeit in 2 m Höhe aus Messhöhe `height` (Gl. 47)."""
+    return u_z * 4.87 / np.log(67.8 * height - 5.42)
+
+
+def psychrometric_constant(elevation):
+    """γ in kPa/°C aus der Stationshöhe (Gl. 7, 8)."""
+    pressure = 101.3 * ((293.0 - 0.0065 * elevation) / 293.0) ** 5.26
+    return 0.000665 * pressure
+
+
+def extraterrestrial_radiation_hourly(time_utc, lat, lon):
+    """
+    Ra (MJ m⁻² h⁻¹) für die Stunde, die zum Zeitpunkt `time_utc` endet.
+    `time_utc`: datetime64 (Vektor oder Standort × Stunde), `lat`/`lon`: Grad.
+    """
+    t = np.asarray(time_utc, dtype="datetime64[m]") - np.timedelta64(30, "m")  # Intervallmitte
+    doy = (t.astype("datetime64[D]") - t.astype("datetime64[Y]")).astype(np.int64) + 1
+    hour = (t - t.astype("datetime64[D]")).astype(np.int64) / 60.0
+
+    phi = np.radians(np.asarray(lat, dtype=np.float64))[:, None]
+    lon = np.asarray(lon, dtype=np.float64)[:, None]
+
+    dr = 1 + 0.033 * np.cos(2 * np.pi * doy / 365)
+    delta = 0.409 * np.sin(2 * np.pi * doy / 365 - 1.39)
+    b = 2 * np.pi * (doy - 81) / 364
+    sc = 0.1645 * np.sin(2 * b) - 0.1255 * np.cos(b) - 0.025 * np.sin(b)
+
+    # Stundenwinkel in Sonnenzeit (UTC + geographische Länge)
+    omega = np.pi / 12 * ((hour + lon / 15.0 + sc) - 12)
+    omega = (omega + np.pi) % (2 * np.pi) - np.pi
+    omega_s = np.arccos(np.clip(-np.tan(phi) * np.tan(delta), -1.0, 1.0))
+    omega1 = np.clip(omega - np.pi / 24, -omega_s, omega_s)
+    omega2 = np.clip(omega + np.pi / 24, -omega_s, omega_s)
+
+    ra = 12 * 60 / np.pi * SOLAR_CONSTANT * dr * (
+        (omega2 - omega1) * np.sin(phi) * np.sin(delta)
+        + np.cos(phi) * np.cos(delta) * (np.sin(omega2) - np.sin(omega1))
+    )
+    return np.maximum(ra, 0.0)
+
+
+def _carry_forward(values, valid, fill):
+    """Letzten gültigen Wert entlang der Zeitachse fortschreiben."""
+    idx = np.where(valid, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    out = np.take_along_axis(values, idx, axis=1)
+    seen = np.maximum.accumulate(valid, axis=1)
+    return np.where(seen, out, fill)
+
+
+def et0_hourly(temp_c, rh_pct, wind_ms, rad_wm2, time_utc, lat, lon, elevation=0.0, wind_height=10.0):
+    """
+    Stündliche ET₀ (mm/h) nach FAO-56 Penman-Monteith.
+
+    - `temp_c`, `rh_pct`, `wind_ms`, `rad_wm2`: Matrizen Standort × Stunde
+      (Lufttemperatur, relative Feuchte, Wind in m/s, Globalstrahlung als
+      Mittel der vorangehenden Stunde)
+    - `time_utc`: Stundenzeitpunkte (Ende des Intervalls), UTC – als Vektor
+      für alle Standorte oder als Matrix Standort × Stunde
+    - `lat`, `lon`, `elevation`: je Standort
+    Negative Nachtwerte werden auf 0 gesetzt.
+    """
+    t = np.asarray(temp_c, dtype=np.float64)
+    rh = np.asarray(rh_pct, dtype=np.float64)
+    u2 = wind_at_2m(np.asarray(wind_ms, dtype=np.float64), wind_height)
+    rs = np.asarray(rad_wm2, dtype=np.float64) * 0.0036  # W/m² → MJ m⁻² h⁻¹
+    elevation = np.broadcast_to(np.asarray(elevation, dtype=np.float64), np.shape(lat))[:, None]
+
+    es = saturation_vapour_pressure(t)
+    ea = es * rh / 100.0
+    slope = 4098 * es / (t + 237.3) ** 2
+    gamma = psychrometric_constant(elevation)
+
+    # Strahlungsbilanz
+    ra = extraterrestrial_radiation_hourly(time_utc, lat, lon)
+    rso = (0.75 + 2e-5 * elevation) * ra
+    day = rso > 0.05  # Sonne deutlich über dem Horizont
+    ratio = np.clip(np.divide(rs, rso, out=np.zeros_like(rs), where=day), 0.25, 1.0)
+    ratio = _carry_forward(ratio, day, NIGHT_RS_RSO)
+
+    rns = (1 - ALBEDO) * rs
+    rnl = STEFAN_BOLTZMANN_H * (t + 273.16) ** 4 * (0.34 - 0.14 * np.sqrt(ea)) * (1.35 * ratio - 0.35)
+    rn = rns - rnl
+    g = np.where(ra > 0, 0.1, 0.5) * rn
+
+    num = 0.408 * slope * (rn - g) + gamma * 37.0 / (t + 273.0) * u2 * (es - ea)
+    den = slope + gamma * (1 + 0.34 * u2)
+    return np.maximum(num / den, 0.0)
+
+
+def et0_from_open_meteo(payloads):
+    """
+    ET₀ (mm/h) aus einer oder mehreren Open-Meteo-Antworten mit den
+    `WEATHER_VARIABLES` (Abfrage mit `wind_speed_unit=ms`).
+    Alle Antworten müssen dasselbe lokale Stundenraster haben.
+    Liefert (lokale Zeitstempel, Matrix Standort × Stunde).
+    """
+    if isinstance(payloads, dict):
+        payloads = [payloads]
+
+    def matrix(var):
+        return np.array(
+            [[np.nan if v is None else v for v in p["hourly"][var]] for p in payloads],
+            dtype=np.float64,
+        )
+
+    local = np.asarray(payloads[0]["hourly"]["time"], dtype="datetime64[m]")
+    # Zeitzonen können je Standort verschieden sein → UTC-Zeit je Zeile
+    offsets = np.array([p.get("utc_offset_seconds", 0) for p in payloads], dtype="timedelta64[s]")
+    et0 = et0_hourly(
+        matrix("temperature_2m"),
+        matrix("relative_humidity_2m"),
+        matrix("wind_speed_10m"),
+        matrix("shortwave_radiation"),
+        local[None, :] - offsets[:, None],
+        [p["latitude"] for p in payloads],
+        [p["longitude"] for p in payloads],
+        [p.get("elevation", 0.0) for p in payloads],
+    )
+    return local, et0
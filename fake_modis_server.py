@@ -0,0 +1,115 @@
+"""
+Lokaler Fake-Server für die MODIS-Auftrags-API (Entwicklung & Tests).
+
+Bildet `subsetOrder` und die Ergebnisdateien von ORNL nach: Aufträge
+werden sofort angenommen, die Ergebnisdatei liefert erst nach
+`--delay` Sekunden HTTP 200 (vorher 404). Die NDVI-Werte sind
+deterministisch aus Koordinate und Datum erzeugt.
+
+Aufruf:
+    python fake_modis_server.py --port 8765 --delay 2
+"""
+import argparse
+import itertools
+import json
+import math
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from modis_bulk import NDVI_BAND, pixels_for_km
+from ndvi_cube import modis_dates
+
+
+def _modis_to_date(modis_date):
+    year, doy = int(modis_date[1:5]), int(modis_date[5:])
+    return date.fromordinal(date(year, 1, 1).toordinal() + doy - 1)
+
+
+def fake_subset_lines(lat, lon, start, end, km):
+    """Zeilen im ORNL-ASCII-Format mit saisonalem NDVI-Verlauf."""
+    n = pixels_for_km(km)
+    for d in modis_dates(_modis_to_date(start), _modis_to_date(end)):
+        doy = date.fromisoformat(d["calendar_date"]).timetuple().tm_yday
+        base = 0.5 + 0.25 * math.sin(2 * math.pi * doy / 365 + lon / 50) - abs(lat) / 400
+        values = [str(int((base + 0.01 * (i % 7)) * 10000)) for i in range(n)]
+        yield ",".join([
+            f"MOD13Q1.{d['modis_date']}.fake",
+            "MOD13Q1",
+            d["modis_date"],
+            f"Lat{lat}Lon{lon}",
+            "2000000000000",
+            NDVI_BAND,
+            *values,
+        ])
+
+
+class FakeModisState:
+    def __init__(self, delay):
+        self.delay = delay
+        self.orders = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json"):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            q = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+            if parts.path.endswith("/subsetOrder"):
+                with state.lock:
+                    order_id = f"fake{next(state.ids):06d}"
+                    state.orders[order_id] = (time.monotonic(), q)
+                return self._send(200, json.dumps({"order_id": order_id}))
+
+            if parts.path.startswith("/subsetdata/"):
+                order_id = parts.path.split("/")[2]
+                order = state.orders.get(order_id)
+                if order is None or time.monotonic() - order[0] < state.delay:
+                    return self._send(404, "not ready", "text/plain")
+                _, q = order
+                lines = fake_subset_lines(
+                    float(q["latitude"]), float(q["longitude"]),
+                    q["startDate"], q["endDate"], float(q["kmAboveBelow"]),
+                )
+                return self._send(200, "\n".join(lines) + "\n", "text/csv")
+
+            self._send(404, json.dumps({"error": "unknown endpoint"}))
+
+    return Handler
+
+
+def serve(port=8765, delay=2.0):
+    """Server starten (blockiert). Liefert nie zurück."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FakeModisState(delay)))
+    server.serve_forever()
+
+
+def start_in_thread(port=0, delay=0.0):
+    """Server im Hintergrund starten, liefert (server, Basis-URL)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FakeModisState(delay)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake-Server für MODIS subsetOrder.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=2.0)
+    args = parser.parse_args()
+    serve(args.port, args.delay)
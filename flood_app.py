@@ -1,7 +1,10 @@
 import streamlit as st
-import requests
 import pandas as pd
 
+import payload_cache
+from risk_model import classify_daily_flood, classify_flash_flood
+from sites import load_registry
+
 st.set_page_config(page_title="Überflutungsindex – Niederschlagsintensität", layout="centered")
 
 st.title("🌊 Überflutungsindex – Starkregen & Flutrisiko")
@@ -9,15 +12,10 @@ st.title("🌊 Überflutungsindex – Starkregen & Flutrisiko")
 # -----------------------------
 # Standorte
 # -----------------------------
-CITIES = {
-    "Darmstadt, Deutschland": (49.8728, 8.6512),
-    "Tucson, USA": (32.2226, -110.9747),
-    "Fortaleza, Brasilien": (-3.7319, -38.5267),
-    "Malolos, Philippinen": (14.8443, 120.8114),
-}
+SITES = load_registry()
 
-city = st.selectbox("📍 Standort auswählen", list(CITIES.keys()))
-lat, lon = CITIES[city]
+site_id = st.selectbox("📍 Standort auswählen", list(SITES.ids), format_func=SITES.name)
+lat, lon = SITES.coords(site_id)
 
 st.write(f"Koordinaten: {lat:.4f}, {lon:.4f}")
 
@@ -35,9 +33,7 @@ def fetch_precipitation(lat, lon, past_days=3, forecast_days=1):
         "past_days": past_days,
         "forecast_days": forecast_days,
     }
-    r = requests.get(url, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    return payload_cache.get_json(url, params, timeout=20)
 
 with st.spinner("Lade Niederschlagsdaten von Open-Meteo…"):
     data = fetch_precipitation(lat, lon)
@@ -76,40 +72,6 @@ df_daily = df_daily_from_hourly.sort_values("date").reset_index(drop=True)
 # -----------------------------
 # 2) Risiko-Klassifikation
 # -----------------------------
-def classify_flash_flood(p3h: float) -> str:
-    """
-    Flash-Flood Risiko auf Basis 3-Stunden-Summe.
-    Grobe Schwellen (vereinfachtes Heuristik-Modell):
-      < 10 mm / 3h  → gering
-      10–20 mm / 3h → moderat
-      > 20 mm / 3h  → hoch
-    """
-    if p3h is None or pd.isna(p3h):
-        return "⚪ Keine Daten"
-    if p3h < 10:
-        return "🟢 Gering"
-    elif p3h < 20:
-        return "🟠 Moderat"
-    else:
-        return "🔴 Hoch"
-
-def classify_daily_flood(p24h: float) -> str:
-    """
-    Tagesflut-Risiko auf Basis 24-Stunden-Summe.
-    Grobe Schwellen:
-      < 20 mm / Tag → gering
-      20–50 mm      → moderat
-      > 50 mm       → hoch
-    """
-    if p24h is None or pd.isna(p24h):
-        return "⚪ Keine Daten"
-    if p24h < 20:
-        return "🟢 Gering"
-    elif p24h < 50:
-        return "🟠 Moderat"
-    else:
-        return "🔴 Hoch"
-
 # Letzte Stunde mit gültiger 3-Stunden-Summe:
 last_row = df_hourly.dropna(subset=["precip_3h"]).iloc[-1]
 last_1h = last_row["precip_1h"]
@@ -0,0 +1,155 @@
+"""
+Dauerlaufender Starkregen-Wächter für alle registrierten Standorte.
+
+Fragt stündlichen Niederschlag bei Open-Meteo in Sammelanfragen
+(mehrere Koordinaten pro Request) ab, schiebt neue Stunden in ein
+24h-Fenster pro Standort und klassifiziert 3h- und 24h-Summen wie
+`flood_app.py`. Ein Ereignis wird nur bei einem Stufenwechsel
+(z. B. Gering → Hoch) ausgegeben; unveränderte Zustände werden
+unterdrückt. Alles läuft vektorisiert über NumPy-Arrays, sodass
+tausende Standorte auf einem Kern überwacht werden können.
+
+Die 24h-Summe ist hier ein gleitendes Fenster über die letzten
+24 Stunden (statt Kalendertag), damit Übergänge sofort erkannt werden.
+
+Aufruf:
+    python flood_watch.py --interval 900
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import numpy as np
+
+from indicators import BATCH_SIZE, batch_matrix, fetch_batch
+from risk_model import DAILY_FLOOD_THRESHOLDS, FLASH_FLOOD_THRESHOLDS, flood_label, flood_levels
+from sites import load_registry
+
+WINDOW_HOURS = 24
+FLASH_HOURS = 3
+POLL_INTERVAL = 900.0   # s
+
+KIND_FLASH = "flash"
+KIND_DAILY = "daily"
+
+
+class FloodEvent(NamedTuple):
+    site_id: str
+    time: str
+    kind: str
+    previous: str
+    current: str
+    value_mm: float
+
+
+def fetch_hourly_precipitation(lats, lons):
+    """
+    Stündlicher Niederschlag (UTC) der letzten 24h für mehrere Standorte.
+    Liefert (Stunden seit Epoche, Matrix Standort × Stunde).
+    """
+    data = fetch_batch(lats, lons, {
+        "hourly": "precipitation",
+        "timezone": "GMT",
+        "past_days": 1,
+        "forecast_days": 1,
+    })
+    hours = np.array(data[0]["hourly"]["time"], dtype="datetime64[h]").astype(np.int64)
+    return hours, batch_matrix(data, "hourly", "precipitation", np.float32)
+
+
+class FloodWatcher:
+    """
+    Zustand des Wächters: 24h-Fenster, letzte verarbeitete Stunde und
+    aktuelle Stufen (Flash / Tag) je Standort.
+    """
+
+    def __init__(self, registry=None, chunk_size=BATCH_SIZE, fetch=fetch_hourly_precipitation):
+        self.registry = registry or load_registry()
+        self.chunk_size = chunk_size
+        self.fetch = fetch
+        n = len(self.registry)
+        self.window = np.full((n, WINDOW_HOURS), np.nan, dtype=np.float32)
+        self.last_hour = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+        self.flash_level = np.full(n, -1, dtype=np.int8)
+        self.daily_level = np.full(n, -1, dtype=np.int8)
+
+    def update(self, idx, hours, values, now_hour):
+        """
+        Neue Stunden eines Blocks von Standorten einarbeiten und
+        Ereignisse für Stufenwechsel liefern.
+        """
+        idx = np.asarray(idx)
+        done = hours <= now_hour  # nur abgeschlossene Stunden
+        hours, values = hours[done], values[:, done]
+
+        # Alle Standorte eines Blocks teilen dasselbe UTC-Stundenraster
+        new = hours > self.last_hour[idx].min()
+        if not new.any():
+            return []
+        new_hours, new_values = hours[new], values[:, new]
+
+        merged = np.concatenate([self.window[idx], new_values], axis=1)
+        self.window[idx] = merged[:, -WINDOW_HOURS:]
+        self.last_hour[idx] = new_hours[-1]
+
+        p3h = self.window[idx, -FLASH_HOURS:].sum(axis=1)
+        p24h = self.window[idx].sum(axis=1)
+        stamp = str(np.datetime64(int(new_hours[-1]), "h"))
+
+        events = []
+        events += self._transitions(idx, KIND_FLASH, self.flash_level, flood_levels(p3h, FLASH_FLOOD_THRESHOLDS), p3h, stamp)
+        events += self._transitions(idx, KIND_DAILY, self.daily_level, flood_levels(p24h, DAILY_FLOOD_THRESHOLDS), p24h, stamp)
+        return events
+
+    def _transitions(self, idx, kind, state, levels, values, stamp):
+        old = state[idx]
+        # Fehlende Stunden (NaN → -1) sind kein Stufenwechsel: letzte bekannte Stufe bleibt
+        levels = np.where(levels < 0, old, levels)
+        # Erster Durchlauf: nur erhöhte Stufen melden, "Gering" ist der Normalzustand
+        changed = (levels != old) & ~((old == -1) & (levels <= 0))
+        state[idx] = levels
+        return [
+            FloodEvent(
+                self.registry.ids[i], stamp, kind,
+                flood_label(o), flood_label(l), round(float(v), 1),
+            )
+            for i, o, l, v in zip(idx[changed], old[changed], levels[changed], values[changed])
+        ]
+
+    def poll_once(self, now=None):
+        """Alle Standorte einmal abfragen; liefert die Liste der Ereignisse."""
+        now = now or datetime.now(timezone.utc)
+        now_hour = np.datetime64(now.replace(tzinfo=None), "h").astype(np.int64)
+        events = []
+        for start in range(0, len(self.registry), self.chunk_size):
+            idx = np.arange(start, min(start + self.chunk_size, len(self.registry)))
+            hours, values = self.fetch(self.registry.lat[idx], self.registry.lon[idx])
+            events += self.update(idx, hours, values, now_hour)
+        return events
+
+    def run(self, interval=POLL_INTERVAL, sink=None):
+        """Endlosschleife: abfragen, Ereignisse an `sink` übergeben, warten."""
+        sink = sink or print_event
+        while True:
+            started = time.monotonic()
+            try:
+                for event in self.poll_once():
+                    sink(event)
+            except Exception as e:
+                print(f"Abfrage fehlgeschlagen: {e}", file=sys.stderr)
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def print_event(event: FloodEvent):
+    print(json.dumps(event._asdict(), ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Starkregen-Wächter für alle Standorte.")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Abfrageintervall (s)")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    FloodWatcher(chunk_size=args.chunk_size).run(args.interval)
@@ -0,0 +1,270 @@
+"""
+Aktuelle Risikoindikatoren je Standort (NDVI, Dürreindex, Starkregen).
+
+Gemeinsame Abrufe für das Risiko-Dashboard und Batch-Läufe; alle Anfragen
+laufen über `payload_cache` und damit über den Request-Scheduler.
+"""
+import json
+import statistics
+
+import numpy as np
+import pandas as pd
+import requests
+
+import payload_cache
+import scheduler
+from ndvi_cube import is_fresh
+
+# -----------------------------------------------------------
+# NDVI – NASA MODIS (wie in ndvi2_app.py)
+# -----------------------------------------------------------
+BASE = "https://modis.ornl.gov/rst/api/v1"
+PRODUCT = "MOD13Q1"  # 16-Tage NDVI
+
+
+def fetch(url, params, ttl=payload_cache.TTL_MODIS_SUBSET, priority=scheduler.INTERACTIVE):
+    try:
+        return payload_cache.get_json(url, params, ttl=ttl, timeout=25, priority=priority), None
+    except requests.HTTPError as e:
+        return None, f"Status {e.response.status_code}"
+    except Exception as e:
+        return None, str(e)
+
+
+def get_current_ndvi(lat, lon, priority=scheduler.INTERACTIVE):
+    latest = get_latest_ndvi(lat, lon, priority)
+    return latest[1] if latest else None
+
+
+def get_latest_ndvi(lat, lon, priority=scheduler.INTERACTIVE):
+    """Letzter MODIS-NDVI live als (Kalenderdatum, NDVI) oder None."""
+    # 1) verfügbare MODIS-Daten finden
+    dates_url = f"{BASE}/{PRODUCT}/dates"
+    dates_data, err = fetch(dates_url, {"latitude": lat, "longitude": lon}, ttl=payload_cache.TTL_MODIS_DATES, priority=priority)
+    if err or not dates_data:
+        return None
+
+    last = dates_data["dates"][-1]
+    last_date = last["modis_date"]
+
+    # 2) NDVI für letztes Datum holen
+    subset_url = f"{BASE}/{PRODUCT}/subset"
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "startDate": last_date,
+        "endDate": last_date,
+        "kmAboveBelow": 0,
+        "kmLeftRight": 0,
+    }
+    data, err = fetch(subset_url, params, priority=priority)
+    if err or not data:
+        return None
+
+    for band in data.get("subset", []):
+        if band.get("band") == "250m_16_days_NDVI":
+            raw_vals = band.get("data", [])
+            if len(raw_vals) == 0:
+                return None
+            # Unskaliert → skaliert (Faktor 0.0001)
+            ndvi = statistics.fmean(raw_vals) * 0.0001
+            return last["calendar_date"], ndvi
+
+    return None
+
+
+# -----------------------------------------------------------
+# DÜRREINDEX – Open-Meteo (ET0 – Niederschlag)
+# -----------------------------------------------------------
+def get_drought(lat, lon, priority=scheduler.INTERACTIVE):
+    """
+    Dürreindex = ET0 - Niederschlag (mm/Tag) für den letzten vollständigen Tag.
+    """
+    url = "https://api.open-meteo.com/v1/forecast"
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "hourly": "et0_fao_evapotranspiration",
+        "daily": "precipitation_sum",
+        "timezone": "auto",
+        "past_days": 3,
+        "forecast_days": 0,
+    }
+    data = payload_cache.get_json(url, params, timeout=25, priority=priority)
+
+    # ET0 stündlich → täglich
+    hourly = data["hourly"]
+    df_hourly = pd.DataFrame(
+        {
+            "time": pd.to_datetime(hourly["time"]),
+            "et0": hourly["et0_fao_evapotranspiration"],
+        }
+    )
+    df_hourly["date"] = df_hourly["time"].dt.normalize()
+    df_et0_daily = (
+        df_hourly.groupby("date", as_index=False)["et0"]
+        .sum()
+        .sort_values("date")
+    )
+
+    # Regen täglich
+    daily = data["daily"]
+    df_rain = pd.DataFrame(
+        {
+            "date": pd.to_datetime(daily["time"]),
+            "rain": daily["precipitation_sum"],
+        }
+    ).sort_values("date")
+
+    df = pd.merge(df_et0_daily, df_rain, on="date", how="inner")
+    last = df.iloc[-1]
+    drought_index = float(last["et0"] - last["rain"])
+    return drought_index
+
+
+# -----------------------------------------------------------
+# ÜBERFLUTUNG – Open-Meteo (Starkregen)
+# -----------------------------------------------------------
+def get_flood(lat, lon, priority=scheduler.INTERACTIVE):
+    """
+    Liefert:
+    - Niederschlag letzte Stunde (mm)
+    - 3h-Summe (mm)
+    - 24h-Summe (mm)
+    """
+    url = "https://api.open-meteo.com/v1/forecast"
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "hourly": "precipitation",
+        "daily": "precipitation_sum",
+        "timezone": "auto",
+        "past_days": 2,
+        "forecast_days": 0,
+    }
+    data = payload_cache.get_json(url, params, timeout=25, priority=priority)
+
+    df = pd.DataFrame(
+        {
+            "time": pd.to_datetime(data["hourly"]["time"]),
+            "p1h": data["hourly"]["precipitation"],
+        }
+    ).sort_values("time")
+
+    df["p3h"] = df["p1h"].rolling(3).sum()
+
+    last_row = df.dropna().iloc[-1]
+    p1h = float(last_row["p1h"])
+    p3h = float(last_row["p3h"])
+
+    # 24h aus daily
+    p24h = float(data["daily"]["precipitation_sum"][-1])
+
+    return p1h, p3h, p24h
+
+
+def get_site_ndvi(site_id, lat, lon, cube=None, priority=scheduler.INTERACTIVE):
+    """
+    NDVI als (Kalenderdatum, NDVI) oder None – bevorzugt aus dem lokalen
+    Würfel (modis_bulk.py), live, wenn der Würfel keinen aktuellen Wert hat.
+    `cube` wird einmal pro Prozess geöffnet (`ndvi_cube.open_default_cube`)
+    und übergeben; None → nur live.
+    """
+    cube_latest = cube.latest(site_id) if cube is not None and site_id in cube else None
+    if cube_latest and is_fresh(cube_latest[0]):
+        return cube_latest
+    return get_latest_ndvi(lat, lon, priority)
+
+
+def get_cube_ndvi_series(site_id, cube):
+    """
+    NDVI-Zeitreihe (DataFrame `date`/`ndvi`) aus dem lokalen Würfel – nur,
+    wenn sie wie in `get_site_ndvi` einen aktuellen letzten Wert hat;
+    sonst None (Zeitreihe live abfragen).
+    """
+    if cube is None or site_id not in cube:
+        return None
+    df = cube.series(site_id)
+    if df.empty or not is_fresh(df["date"].iloc[-1].date().isoformat()):
+        return None
+    return df
+
+
+# -----------------------------------------------------------
+# OPEN-METEO – Sammelabfragen (mehrere Koordinaten pro Anfrage)
+# -----------------------------------------------------------
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+BATCH_SIZE = 100  # Koordinaten pro Open-Meteo-Anfrage
+
+
+# Parameter für `batch_weather`: Dürreindex und Starkregen in einer Anfrage
+WEATHER_PARAMS = {
+    "hourly": "precipitation,et0_fao_evapotranspiration",
+    "daily": "precipitation_sum",
+    "timezone": "auto",
+    "past_days": 3,
+    "forecast_days": 0,
+}
+
+
+def fetch_batch_raw(lats, lons, params, priority=scheduler.BATCH):
+    """
+    Eine Open-Meteo-Anfrage für mehrere Koordinaten (höchstens
+    `BATCH_SIZE`). Liefert den Antwort-Body unverändert (bytes), damit
+    das Dekodieren (`decode_batch`) auch in einem anderen Prozess laufen kann.
+    """
+    params = dict(
+        params,
+        latitude=",".join(f"{v:.4f}" for v in lats),
+        longitude=",".join(f"{v:.4f}" for v in lons),
+    )
+    r = scheduler.get(OPEN_METEO_URL, params, priority=priority)
+    r.raise_for_status()
+    return r.content
+
+
+def decode_batch(body):
+    """Antwort-Body einer Sammelanfrage → eine Antwortstruktur je Koordinate."""
+    data = json.loads(body)
+    if isinstance(data, dict):  # Einzelstandort → kein Listen-Format
+        data = [data]
+    return data
+
+
+def fetch_batch(lats, lons, params, priority=scheduler.BATCH):
+    """`fetch_batch_raw` + `decode_batch`: eine Antwortstruktur je Koordinate."""
+    return decode_batch(fetch_batch_raw(lats, lons, params, priority))
+
+
+def batch_matrix(data, section, key, dtype=np.float64):
+    """Eine Größe aller Koordinaten als Matrix (Koordinate × Zeit), None → NaN."""
+    return np.array([[np.nan if v is None else v for v in d[section][key]] for d in data], dtype=dtype)
+
+
+def batch_weather(data):
+    """
+    Dürreindex (ET₀ − Regen des letzten Tages), 1h-, 3h- und 24h-Regen je
+    Koordinate aus einer Sammelantwort mit `WEATHER_PARAMS` – dieselben
+    Größen wie `get_drought` und `get_flood`, als Arrays.
+    """
+    rain_hourly = batch_matrix(data, "hourly", "precipitation")
+    et0_hourly = batch_matrix(data, "hourly", "et0_fao_evapotranspiration")
+    rain_daily = batch_matrix(data, "daily", "precipitation_sum")
+    hours = batch_matrix(data, "hourly", "time", "datetime64[h]")
+    last_day = np.array([d["daily"]["time"][-1] for d in data], dtype="datetime64[D]")
+
+    # Dürre: ET₀-Summe des letzten Tages minus dessen Regensumme
+    on_last_day = hours.astype("datetime64[D]") == last_day[:, None]
+    et0_last = np.where(on_last_day, np.nan_to_num(et0_hourly), 0.0).sum(axis=1)
+    drought = et0_last - rain_daily[:, -1]
+
+    # Letzte vollständige 3h-Summe und deren letzte Stunde
+    rolling = rain_hourly[:, 2:] + rain_hourly[:, 1:-1] + rain_hourly[:, :-2]
+    valid = ~np.isnan(rolling)
+    last = rolling.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    rows = np.arange(len(rolling))
+    has_3h = valid.any(axis=1)
+    p3h = np.where(has_3h, rolling[rows, last], np.nan)
+    p1h = np.where(has_3h, rain_hourly[rows, last + 2], np.nan)
+
+    return drought, p1h, p3h, rain_daily[:, -1]
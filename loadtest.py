@@ -0,0 +1,297 @@
+"""
+Lasttest für das Risiko-Dashboard mit parallelen Sitzungen.
+
+Jede simulierte Sitzung startet `risk_dashboard.py` über Streamlits
+`AppTest`, wechselt danach mehrfach den Standort und misst die Dauer jedes
+Reruns. Alle Sitzungen laufen gleichzeitig in einem Prozess – wie auf
+einem Streamlit-Server teilen sie sich Scheduler und Platten-Cache.
+Upstream-Anfragen beantwortet ein lokaler Stub (synthetische Open-Meteo-
+und MODIS-Antworten) oder die Aufzeichnungen aus `replay.py`.
+
+Ausgabe: Durchsatz, p50/p95/p99 der Rerun-Latenz, Fehler,
+Upstream-Aufrufe pro Sitzung und Host sowie – getrennt davon – die Zeit,
+die Anfragen im Scheduler auf ein Token gewartet haben. Mit
+`--limit-scale` bzw. `--no-limits` werden die Host-Limits des Schedulers
+skaliert bzw. aufgehoben, um die App ohne Drosselung gegen Stub/Replay
+zu messen.
+
+Aufruf:
+    python loadtest.py --sessions 20 --switches 10 --latency-ms 150
+    python loadtest.py --upstream replay --fixtures data/fixtures --no-limits
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.testing.v1 import AppTest
+
+import cache_manager
+import replay
+import scheduler
+from sites import load_registry
+
+DASHBOARD = Path(__file__).with_name("risk_dashboard.py")
+RERUN_TIMEOUT = 120  # s
+NO_LIMIT_SCALE = 1e6  # --no-limits: Host-Limits praktisch aufgehoben
+
+
+# -----------------------------------------------------------
+# UPSTREAM-STUB
+# -----------------------------------------------------------
+def _noise(*parts):
+    """Deterministische Pseudo-Zufallszahl 0–1 aus den Anfrageparametern."""
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2**32
+
+
+def fake_open_meteo(params):
+    lat, lon = float(params["latitude"]), float(params["longitude"])
+    days = int(params.get("past_days", 0)) + int(params.get("forecast_days", 7))
+    start = date.today() - timedelta(days=int(params.get("past_days", 0)))
+    day_list = [start + timedelta(days=d) for d in range(days)]
+    hours = [datetime.combine(d, datetime.min.time()) + timedelta(hours=h) for d in day_list for h in range(24)]
+
+    def hourly_value(var, t):
+        x = _noise(lat, lon, var, t.isoformat())
+        if var == "precipitation":
+            return round(max(0.0, x - 0.8) * 20, 1)
+        if var == "et0_fao_evapotranspiration":
+            return round(0.5 * max(0.0, np.sin(np.pi * (t.hour - 6) / 12)) * (0.5 + x), 2)
+        return round(x * 10, 1)
+
+    payload = {"latitude": lat, "longitude": lon, "utc_offset_seconds": 0, "elevation": 0.0}
+    if params.get("hourly"):
+        payload["hourly"] = {"time": [t.strftime("%Y-%m-%dT%H:%M") for t in hours]}
+        for var in params["hourly"].split(","):
+            payload["hourly"][var] = [hourly_value(var, t) for t in hours]
+    if params.get("daily"):
+        payload["daily"] = {"time": [d.isoformat() for d in day_list]}
+        for var in params["daily"].split(","):
+            payload["daily"][var] = [round(max(0.0, _noise(lat, lon, var, d.isoformat()) - 0.6) * 40, 1) for d in day_list]
+    return payload
+
+
+def fake_modis(path, params):
+    lat, lon = float(params["latitude"]), float(params["longitude"])
+    if path.endswith("/dates"):
+        return {"dates": [{"modis_date": "A2026273", "calendar_date": "2026-09-30"}]}
+    ndvi = int((0.3 + 0.5 * _noise(lat, lon, params.get("startDate"))) * 10000)
+    return {"subset": [{"band": "250m_16_days_NDVI", "data": [ndvi]}]}
+
+
+class StubUpstream:
+    """
+    Ersatz für `requests.get`: beantwortet Open-Meteo- und MODIS-Anfragen
+    synthetisch mit `latency_ms` Verzögerung und zählt die Aufrufe je
+    simulierter Sitzung und Host.
+    """
+
+    def __init__(self, latency_ms=100.0, seed=None):
+        self.latency_ms = latency_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = Counter()  # (Sitzung, Host) → Anzahl
+
+    def __call__(self, url, params=None, timeout=None, **kwargs):
+        parts = urlsplit(url)
+        with self._lock:
+            self.calls[(_session_id(), parts.hostname)] += 1
+            delay = self._rng.uniform(0.5, 1.5) * self.latency_ms / 1000.0
+        time.sleep(delay)
+        params = params or {}
+        if parts.hostname == "modis.ornl.gov":
+            body = fake_modis(parts.path, params)
+        else:
+            body = fake_open_meteo(params)
+        return replay._response(url, 200, {"Content-Type": "application/json"}, json.dumps(body).encode("utf-8"))
+
+
+class CountingTransport:
+    """Zählt Aufrufe eines vorhandenen Transports (z. B. `ReplayTransport`)."""
+
+    def __init__(self, send):
+        self.send = send
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def __call__(self, url, params=None, timeout=None, **kwargs):
+        with self._lock:
+            self.calls[(_session_id(), urlsplit(url).hostname)] += 1
+        return self.send(url, params=params, timeout=timeout, **kwargs)
+
+
+# AppTest vergibt allen Sitzungen dieselbe Session-ID ("test session id")
+# und startet pro Rerun einen eigenen Skript-Thread → die Nummer der
+# simulierten Sitzung steht im Session-State jeder AppTest-Instanz.
+SESSION_KEY = "_loadtest_session"
+
+
+def _session_id():
+    """Nummer der simulierten Sitzung, deren Skript die Anfrage auslöst."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None or SESSION_KEY not in ctx.session_state:
+        return "-"
+    return ctx.session_state[SESSION_KEY]
+
+
+# -----------------------------------------------------------
+# SITZUNGEN
+# -----------------------------------------------------------
+def run_session(session, site_ids, switches, seed, start_barrier):
+    """Eine Sitzung: erster Aufruf + `switches` Standortwechsel. Liefert (Latenzen, Fehler)."""
+    rng = random.Random(seed)
+    at = AppTest.from_file(str(DASHBOARD), default_timeout=RERUN_TIMEOUT)
+    at.session_state[SESSION_KEY] = session
+    latencies, errors = [], 0
+    start_barrier.wait()
+
+    def timed(action):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            action()
+            if at.exception:
+                errors += 1
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+
+    timed(at.run)
+    for _ in range(switches):
+        current = at.selectbox[0].value if at.selectbox else None
+        choices = [s for s in site_ids if s != current] or site_ids
+        site_id = rng.choice(choices)
+        timed(lambda: at.selectbox[0].set_value(site_id).run())
+    return latencies, errors
+
+
+def scaled_limits(scale):
+    """`scheduler.HOST_LIMITS` mit Rate und Burst × `scale`."""
+    return {
+        host: (rate * scale, max(1, round(burst * scale)))
+        for host, (rate, burst) in scheduler.HOST_LIMITS.items()
+    }
+
+
+def run_load_test(sessions=10, switches=5, transport=None, seed=0, limit_scale=1.0):
+    """
+    `sessions` Sitzungen gleichzeitig starten. `transport` ersetzt den
+    Upstream-Zugriff des Schedulers und muss ein `calls`-Zähler haben;
+    `limit_scale` skaliert die Host-Limits des Schedulers.
+    """
+    scheduler.set_scheduler(scheduler.RequestScheduler(limits=scaled_limits(limit_scale), send=transport))
+    site_ids = list(load_registry().ids)
+    barrier = threading.Barrier(sessions)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, i, site_ids, switches, seed + i, barrier) for i in range(sessions)]
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - t0
+
+    latencies = np.array([lat for lats, _ in results for lat in lats])
+    per_session = defaultdict(int)
+    per_host = Counter()
+    for (session, host), n in transport.calls.items():
+        per_session[session] += n
+        per_host[host] += n
+    calls = np.array(list(per_session.values()) or [0])
+    sched = scheduler.get_scheduler().metrics()
+    wait_total = sum(m["wait_total_s"] for m in sched.values())
+
+    return {
+        "sessions": sessions,
+        "reruns": int(latencies.size),
+        "errors": sum(e for _, e in results),
+        "wall_s": wall,
+        "throughput_rps": latencies.size / wall if wall else 0.0,
+        "latency_p50_s": float(np.percentile(latencies, 50)),
+        "latency_p95_s": float(np.percentile(latencies, 95)),
+        "latency_p99_s": float(np.percentile(latencies, 99)),
+        "upstream_calls": int(sum(per_host.values())),
+        "upstream_calls_per_session_avg": float(calls.mean()),
+        "upstream_calls_per_session_max": int(calls.max()),
+        "upstream_calls_per_host": dict(per_host),
+        "limit_scale": limit_scale,
+        # Wartezeit auf Scheduler-Tokens, in der Rerun-Latenz enthalten
+        "scheduler_wait_total_s": wait_total,
+        "scheduler_wait_share": wait_total / latencies.sum() if latencies.sum() else 0.0,
+        "scheduler": sched,
+        "cache": cache_manager.get_cache().metrics(),
+    }
+
+
+def print_report(report):
+    print(f"Sitzungen:        {report['sessions']}  ({report['reruns']} Reruns, {report['errors']} Fehler)")
+    print(f"Dauer:            {report['wall_s']:.1f} s  →  {report['throughput_rps']:.2f} Reruns/s")
+    print(
+        "Rerun-Latenz:     "
+        f"p50 {report['latency_p50_s'] * 1000:.0f} ms · "
+        f"p95 {report['latency_p95_s'] * 1000:.0f} ms · "
+        f"p99 {report['latency_p99_s'] * 1000:.0f} ms"
+    )
+    print(
+        f"Upstream-Aufrufe: {report['upstream_calls']} gesamt, "
+        f"Ø {report['upstream_calls_per_session_avg']:.1f} / max {report['upstream_calls_per_session_max']} pro Sitzung"
+    )
+    for host, n in sorted(report["upstream_calls_per_host"].items()):
+        print(f"  {host}: {n} Aufrufe")
+    limits = "aufgehoben" if report["limit_scale"] >= NO_LIMIT_SCALE else f"× {report['limit_scale']:g}"
+    print(
+        f"Scheduler-Wartezeit: {report['scheduler_wait_total_s']:.1f} s gesamt "
+        f"({report['scheduler_wait_share']:.0%} der Rerun-Zeit), Host-Limits {limits}"
+    )
+    for host, m in sorted(report["scheduler"].items()):
+        print(
+            f"  {host}: Ø {m['wait_avg_s'] * 1000:.0f} ms / max {m['wait_max_s'] * 1000:.0f} ms, "
+            f"gedrosselt {m['throttled']}"
+        )
+    c = report["cache"]
+    print(
+        f"Speicher-Cache:   {c['bytes'] / 1024:.0f}/{c['max_bytes'] / 1024:.0f} KiB, "
+        f"Trefferquote {c['hit_rate']:.0%}, {c['evictions']} verdrängt, {c['spills']} ausgelagert"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lasttest des Risiko-Dashboards mit parallelen Sitzungen.")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--switches", type=int, default=5, help="Standortwechsel pro Sitzung")
+    parser.add_argument("--upstream", choices=("stub", "replay"), default="stub")
+    parser.add_argument("--fixtures", default=None, help="Fixture-Verzeichnis für --upstream replay")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Latenz des Stubs")
+    parser.add_argument("--limit-scale", type=float, default=1.0, help="Host-Limits des Schedulers (Rate, Burst) skalieren")
+    parser.add_argument("--no-limits", action="store_true", help="Host-Limits aufheben (nur gegen Stub/Replay sinnvoll)")
+    parser.add_argument("--keep-cache", action="store_true", help="vorhandenen Platten-Cache verwenden")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Bericht als JSON ausgeben")
+    args = parser.parse_args()
+
+    # Frischer Cache, damit jede Messung dieselben Upstream-Aufrufe auslöst
+    # (muss vor dem Import von payload_cache gesetzt sein)
+    if not args.keep_cache:
+        os.environ["NIKKI_CACHE_DIR"] = tempfile.mkdtemp(prefix="nikki-loadtest-")
+
+    if args.upstream == "stub":
+        transport = StubUpstream(args.latency_ms, args.seed)
+    else:
+        transport = CountingTransport(replay.ReplayTransport(replay.REPLAY, args.fixtures or replay.FIXTURE_DIR))
+
+    limit_scale = NO_LIMIT_SCALE if args.no_limits else args.limit_scale
+    report = run_load_test(args.sessions, args.switches, transport, args.seed, limit_scale)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_report(report)
@@ -0,0 +1,193 @@
+"""
+Bulk-Ingest von MODIS-NDVI für größere Flächen.
+
+Statt pro Punkt und Datum `/subset` aufzurufen, wird pro Standort ein
+Flächen-Auftrag (ORNL `subsetOrder`) abgesetzt. Die Aufträge werden
+asynchron abgefragt, und sobald die Ergebnisdatei bereitsteht, wird sie
+zeilenweise gestreamt und direkt in den lokalen NDVI-Würfel geschrieben.
+
+Aufruf:
+    python modis_bulk.py 2024-01-01 2024-12-31 --km 2
+    python modis_bulk.py 2024-01-01 2024-03-31 --base http://localhost:8765/rst/api/v1 \\
+        --results http://localhost:8765/subsetdata      # gegen fake_modis_server.py
+"""
+import argparse
+import asyncio
+from datetime import date
+
+import numpy as np
+
+import scheduler
+from ndvi_cube import DEFAULT_CUBE_DIR, NDVICube, modis_dates
+from sites import load_registry
+
+BASE = "https://modis.ornl.gov/rst/api/v1"
+RESULT_BASE = "https://modis.ornl.gov/subsetdata"
+PRODUCT = "MOD13Q1"
+NDVI_BAND = "250m_16_days_NDVI"
+NDVI_SCALE = 0.0001
+NDVI_FILL = -3000
+
+POLL_INTERVAL = 30.0   # s
+JOB_TIMEOUT = 3600.0   # s
+CONCURRENCY = 8
+
+
+def pixels_for_km(km_above_below, km_left_right=None):
+    """Pixelanzahl eines 250m-Ausschnitts (Zeilen × Spalten)."""
+    if km_left_right is None:
+        km_left_right = km_above_below
+    rows = 2 * int(round(km_above_below * 4)) + 1
+    cols = 2 * int(round(km_left_right * 4)) + 1
+    return rows * cols
+
+
+def parse_subset_line(line):
+    """
+    Eine Zeile des ORNL-ASCII-Formats zerlegen:
+    `<id>,<produkt>,<A-datum>,<lage>,<verarbeitet>,<band>,<wert>,<wert>,…`
+    Liefert (modis_date, band, Werte) oder None für Kopf-/Leerzeilen.
+    """
+    parts = line.strip().split(",")
+    if len(parts) < 7 or not parts[2].startswith("A"):
+        return None
+    values = np.array(parts[6:], dtype=np.float32)
+    return parts[2], parts[5], values
+
+
+# -----------------------------------------------------------
+# AUFTRAGS-CLIENT
+# -----------------------------------------------------------
+class ModisOrderClient:
+    def __init__(self, base=BASE, result_base=RESULT_BASE, product=PRODUCT, email=None):
+        self.base = base
+        self.result_base = result_base
+        self.product = product
+        self.email = email
+
+    def submit(self, lat, lon, start, end, km):
+        """Flächen-Auftrag absetzen, liefert die Auftrags-ID."""
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "startDate": start,
+            "endDate": end,
+            "kmAboveBelow": km,
+            "kmLeftRight": km,
+            "email": self.email,
+        }
+        res = scheduler.get(f"{self.base}/{self.product}/subsetOrder", params, priority=scheduler.BATCH)
+        res.raise_for_status()
+        return str(res.json()["order_id"])
+
+    def result_url(self, order_id):
+        return f"{self.result_base}/{order_id}/data_file.csv"
+
+    def is_ready(self, order_id):
+        res = scheduler.get(self.result_url(order_id), priority=scheduler.BATCH, stream=True)
+        res.close()
+        if res.status_code == 404:
+            return False
+        res.raise_for_status()
+        return True
+
+    def iter_rows(self, order_id, band=NDVI_BAND):
+        """Ergebnisdatei streamen und (modis_date, Werte) des Bandes liefern."""
+        res = scheduler.get(self.result_url(order_id), timeout=120, priority=scheduler.BATCH, stream=True)
+        res.raise_for_status()
+        with res:
+            for line in res.iter_lines(decode_unicode=True):
+                row = parse_subset_line(line) if line else None
+                if row and row[1] == band:
+                    yield row[0], row[2]
+
+
+# -----------------------------------------------------------
+# PIPELINE
+# -----------------------------------------------------------
+def _stream_into_cube(client, cube, site_id, order_id):
+    n = 0
+    for modis_date, raw in client.iter_rows(order_id):
+        if not cube.has_date(modis_date):
+            continue
+        values = np.where(raw == NDVI_FILL, np.nan, raw * NDVI_SCALE)
+        cube.write(site_id, modis_date, values)
+        n += 1
+    cube.flush()
+    return n
+
+
+async def _ingest_site(client, cube, registry, site_id, start, end, km, poll_interval, timeout, sem):
+    lat, lon = registry.coords(site_id)
+    async with sem:
+        order_id = await asyncio.to_thread(client.submit, lat, lon, start, end, km)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not await asyncio.to_thread(client.is_ready, order_id):
+        if loop.time() > deadline:
+            raise TimeoutError(f"MODIS-Auftrag {order_id} ({site_id}) nicht fertig.")
+        await asyncio.sleep(poll_interval)
+
+    async with sem:
+        return await asyncio.to_thread(_stream_into_cube, client, cube, site_id, order_id)
+
+
+async def ingest_area(cube, site_ids, start, end, km, client=None, registry=None,
+                      poll_interval=POLL_INTERVAL, timeout=JOB_TIMEOUT, concurrency=CONCURRENCY):
+    """
+    Aufträge für alle Standorte parallel abarbeiten.
+    Liefert {site_id: Anzahl geschriebener Zeitpunkte oder Exception}.
+    """
+    client = client or ModisOrderClient()
+    registry = registry or load_registry()
+    sem = asyncio.Semaphore(concurrency)
+    tasks = [
+        _ingest_site(client, cube, registry, s, start, end, km, poll_interval, timeout, sem)
+        for s in site_ids
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return dict(zip(site_ids, results))
+
+
+def ingest(start: date, end: date, km=1, site_ids=None, path=DEFAULT_CUBE_DIR, client=None, **kwargs):
+    """
+    Würfel neu anlegen, für alle (bzw. die angegebenen) Standorte füllen
+    und danach veröffentlichen – laufende Leser sehen bis dahin den alten.
+    """
+    registry = load_registry()
+    site_ids = list(site_ids or registry.ids)
+    dates = modis_dates(start, end)
+    if not dates:
+        raise ValueError("Zeitraum enthält keinen MODIS-Zeitpunkt.")
+    cube = NDVICube.create(path, site_ids, dates, pixels_for_km(km))
+    results = asyncio.run(ingest_area(
+        cube, site_ids, dates[0]["modis_date"], dates[-1]["modis_date"], km,
+        client=client, registry=registry, **kwargs,
+    ))
+    cube.publish()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MODIS-NDVI als Bulk-Aufträge in den lokalen Würfel laden.")
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat)
+    parser.add_argument("--km", type=float, default=1.0, help="Ausdehnung um den Standort (km)")
+    parser.add_argument("--sites", nargs="*", help="Standort-IDs (Standard: alle)")
+    parser.add_argument("--out", default=DEFAULT_CUBE_DIR)
+    parser.add_argument("--base", default=BASE)
+    parser.add_argument("--results", default=RESULT_BASE)
+    parser.add_argument("--email")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    client = ModisOrderClient(args.base, args.results, email=args.email)
+    results = ingest(args.start, args.end, args.km, args.sites, args.out, client, poll_interval=args.poll)
+    for site_id, res in results.items():
+        status = f"FEHLER: {res}" if isinstance(res, Exception) else f"{res} Zeitpunkte"
+        print(f"{site_id}: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,32 +3,34 @@ import requests
 import statistics
 import pandas as pd
 
+import payload_cache
+from cache_manager import memoize
+from indicators import get_cube_ndvi_series
+from ndvi_cube import open_default_cube
+from sites import load_registry
+
 # --- Page Setup ---
 st.set_page_config(page_title="NDVI Analyse – NASA MODIS", layout="centered")
 st.title("🌱 NDVI Analyse – NASA MODIS Subset API")
 
 # --- Cities ---
-CITIES = {
-    "Darmstadt, Deutschland": (49.8728, 8.6512),
-    "Tucson, USA": (32.2226, -110.9747),
-    "Fortaleza, Brasilien": (-3.7319, -38.5267),
-    "Malolos, Philippinen": (14.8443, 120.8114),
-}
+SITES = load_registry()
 
-city = st.selectbox("📍 Stadt auswählen", list(CITIES.keys()))
-lat, lon = CITIES[city]
+site_id = st.selectbox("📍 Stadt auswählen", list(SITES.ids), format_func=SITES.name)
+city = SITES.name(site_id)
+lat, lon = SITES.coords(site_id)
 
 PRODUCT = "MOD13Q1"
 BASE = "https://modis.ornl.gov/rst/api/v1"
 
 
 # --- Helper: Fetch wrapper ---
-def fetch(url, params):
+def fetch(url, params, ttl=payload_cache.TTL_MODIS_SUBSET):
     try:
-        res = requests.get(url, params=params, timeout=20)
-        if res.status_code != 200:
-            return None, f"HTTP {res.status_code}: {res.text[:200]}"
-        return res.json(), None
+        return payload_cache.get_json(url, params, ttl=ttl, timeout=20), None
+    except requests.HTTPError as e:
+        res = e.response
+        return None, f"HTTP {res.status_code}: {res.text[:200]}"
     except Exception as e:
         return None, str(e)
 
@@ -36,7 +38,7 @@ def fetch(url, params):
 # --- 1) Latest MODIS Date ---
 def get_latest_modis_date(lat, lon):
     url = f"{BASE}/{PRODUCT}/dates"
-    data, err = fetch(url, {"latitude": lat, "longitude": lon})
+    data, err = fetch(url, {"latitude": lat, "longitude": lon}, ttl=payload_cache.TTL_MODIS_DATES)
     if err:
         return None, None, err
     dates = data.get("dates")
@@ -113,10 +115,11 @@ with st.spinner("Hole NASA-Daten…"):
 # --- NDVI Zeitreihe (letzte 10 MODIS-Datenpunkte) ---
 st.subheader("📈 NDVI – Zeitreihe (letzte 10 Messungen)")
 
+@memoize(ttl=payload_cache.TTL_MODIS_DATES, when=lambda result: result[1] is None)
 def get_ndvi_time_series(lat, lon, limit=10):
     # 1) Liste aller MODIS-Daten
     url = f"{BASE}/{PRODUCT}/dates"
-    dates_data, err = fetch(url, {"latitude": lat, "longitude": lon})
+    dates_data, err = fetch(url, {"latitude": lat, "longitude": lon}, ttl=payload_cache.TTL_MODIS_DATES)
     if err:
         return None, err
     
@@ -146,6 +149,11 @@ def get_ndvi_time_series(lat, lon, limit=10):
 
         data, err2 = fetch(url, params)
         if err2:
+            # Lücke sichtbar lassen statt das Datum zu verwerfen
+            records.append({
+                "date": calendar_date,
+                "ndvi": None
+            })
             continue
 
         # NDVI-Band extrahieren
@@ -160,14 +168,32 @@ def get_ndvi_time_series(lat, lon, limit=10):
                     "ndvi": ndvi_value
                 })
 
-    if len(records) == 0:
+    if all(r["ndvi"] is None for r in records):
         return None, "Keine NDVI-Zeitreihe gefunden."
 
     return records, None
 
 
+def get_ndvi_time_series_from_cube(site_id, limit=10):
+    # Lokaler NDVI-Würfel (modis_bulk.py) – keine API-Aufrufe nötig;
+    # veraltete Würfel → None, dann live wie im Dashboard
+    df = get_cube_ndvi_series(site_id, open_default_cube())
+    if df is None:
+        return None
+    df = df.tail(limit)
+    return [
+        {"date": d.date().isoformat(), "ndvi": float(v)}
+        for d, v in zip(df["date"], df["ndvi"])
+    ]
+
+
 # --- Plot Zeitreihe ---
-series, serr = get_ndvi_time_series(lat, lon)
+series = get_ndvi_time_series_from_cube(site_id)
+if series is not None:
+    serr = None
+    st.caption("Quelle: lokaler NDVI-Würfel (Flächenmittel)")
+else:
+    series, serr = get_ndvi_time_series(lat, lon)
 
 if serr:
     st.error(serr)
@@ -176,3 +202,7 @@ else:
     df_ts["date"] = pd.to_datetime(df_ts["date"])
 
     st.line_chart(df_ts.set_index("date"))
+
+    missing = int(df_ts["ndvi"].isna().sum())
+    if missing:
+        st.caption(f"⚠️ {missing} MODIS-Zeitpunkt(e) konnten nicht geladen werden (Lücken im Chart).")
@@ -2,6 +2,9 @@ import streamlit as st
 import requests
 import pandas as pd
 
+import payload_cache
+from sites import load_registry
+
 # Seiteneinstellungen
 st.set_page_config(
     page_title="AcriRisk – Live Klima Daten",
@@ -11,15 +14,10 @@ st.set_page_config(
 st.title("🌱 Live Klima- & Wetterdaten für Agrarregionen")
 
 # Städte + Koordinaten
-cities = {
-    "Darmstadt, Deutschland": (49.8728, 8.6512),
-    "Malolos, Philippinen": (14.8549, 120.8100),
-    "Fortaleza, Brasilien": (-3.7319, -38.5267),
-    "Tucson, USA": (32.2226, -110.9747),
-}
+SITES = load_registry()
 
-city_name = st.selectbox("Standort auswählen", list(cities.keys()))
-lat, lon = cities[city_name]
+site_id = st.selectbox("Standort auswählen", list(SITES.ids), format_func=SITES.name)
+lat, lon = SITES.coords(site_id)
 
 st.write(f"**Koordinaten:** {lat}, {lon}")
 
@@ -31,7 +29,12 @@ url = (
     "&forecast_days=7&timezone=auto"
 )
 
-res = requests.get(url).json()
+try:
+    res = payload_cache.get_json(url)
+except requests.HTTPError as e:
+    st.error("⚠️ Wetterdaten konnten nicht geladen werden.")
+    st.write(e.response.text if e.response is not None else str(e))
+    st.stop()
 
 days = res["daily"]["time"]
 temp_max = res["daily"]["temperature_2m_max"]
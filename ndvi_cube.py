@@ -0,0 +1,213 @@
+"""
+Lokaler NDVI-Würfel (Standort × Zeit × Pixel) auf Basis von Memory-Maps.
+
+Der Würfel ist in Kacheln zu je `tile_sites` Standorten aufgeteilt
+(eine `.f32`-Datei pro Kachel) und wird über `meta.json` beschrieben.
+Werte sind skalierter NDVI als float32, fehlende Pixel sind NaN.
+Gelesen wird ohne vollständiges Laden – nur die benötigten Seiten der
+Kachel landen im Speicher.
+
+Jeder Neuaufbau schreibt in ein eigenes Laufverzeichnis (`<lauf>/tile_*.f32`);
+erst `publish()` stellt `meta.json` atomar um. Offene Leser behalten ihre
+Memory-Maps auf den alten Lauf, bis sie neu öffnen (`open_cube` erkennt
+die Umstellung); der vorherige Lauf bleibt dafür bis zum nächsten Neuaufbau
+liegen, ältere werden gelöscht.
+"""
+import json
+import os
+import shutil
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CUBE_DIR = Path(os.environ.get("NIKKI_NDVI_CUBE", Path(__file__).with_name("data") / "ndvi_cube"))
+META_FILE = "meta.json"
+TILE_SITES = 256
+
+# MOD13Q1: 16-Tage-Komposite ab Tag 1, 17, 33, … jedes Jahres
+COMPOSITE_DAYS = 16
+# Ältere Würfelwerte gelten nicht mehr als "aktuell" (zwei Kompositperioden)
+MAX_AGE_DAYS = 2 * COMPOSITE_DAYS
+
+
+def modis_dates(start: date, end: date):
+    """Alle MOD13Q1-Zeitpunkte zwischen `start` und `end` (inklusive)."""
+    out = []
+    for year in range(start.year, end.year + 1):
+        for doy in range(1, 366, COMPOSITE_DAYS):
+            d = date(year, 1, 1) + timedelta(days=doy - 1)
+            if start <= d <= end:
+                out.append({"modis_date": f"A{year}{doy:03d}", "calendar_date": d.isoformat()})
+    return out
+
+
+class NDVICube:
+    def __init__(self, path, meta, mode="r"):
+        self.path = Path(path)
+        self.meta = meta
+        self.mode = mode
+        self.site_ids = meta["site_ids"]
+        self.dates = meta["dates"]
+        self.n_pixels = meta["n_pixels"]
+        self.tile_sites = meta["tile_sites"]
+        # Ältere Würfel ohne Laufverzeichnis liegen direkt unter `path`
+        self.build = meta.get("build")
+        self.tile_dir = self.path / self.build if self.build else self.path
+        self._site_index = {s: i for i, s in enumerate(self.site_ids)}
+        self._date_index = {d["modis_date"]: i for i, d in enumerate(self.dates)}
+        self._tiles = {}
+
+    # --- Anlegen / Öffnen -----------------------------------------------
+    @classmethod
+    def create(cls, path, site_ids, dates, n_pixels, tile_sites=TILE_SITES):
+        """
+        Legt einen leeren (NaN-gefüllten) Würfel in einem neuen
+        Laufverzeichnis an. Leser sehen ihn erst nach `publish()`.
+        """
+        path = Path(path)
+        meta = {
+            "build": f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%fZ}",
+            "site_ids": list(site_ids),
+            "dates": list(dates),
+            "n_pixels": int(n_pixels),
+            "tile_sites": int(tile_sites),
+        }
+        cube = cls(path, meta, mode="r+")
+        cube.tile_dir.mkdir(parents=True)
+        for t in range(cube.n_tiles):
+            arr = np.memmap(cube._tile_file(t), dtype=np.float32, mode="w+", shape=cube._tile_shape())
+            arr[:] = np.nan
+            arr.flush()
+            del arr
+        return cube
+
+    def publish(self):
+        """
+        Lauf fertigstellen: Kacheln sichern, `meta.json` atomar auf diesen
+        Lauf umstellen und alle Läufe außer diesem und dem vorherigen löschen.
+        """
+        self.flush()
+        previous = _read_meta(self.path)
+        keep = {self.build, previous.get("build") if previous else None}
+        tmp = self.path / (META_FILE + ".tmp")
+        tmp.write_text(json.dumps(self.meta), encoding="utf-8")
+        os.replace(tmp, self.path / META_FILE)
+        for entry in self.path.iterdir():
+            if entry.is_dir() and entry.name not in keep:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    @classmethod
+    def open(cls, path, mode="r"):
+        path = Path(path)
+        meta = _read_meta(path)
+        if meta is None:
+            raise FileNotFoundError(path / META_FILE)
+        return cls(path, meta, mode=mode)
+
+    def is_current(self):
+        """False, sobald `meta.json` auf einen neueren Lauf verweist."""
+        meta = _read_meta(self.path)
+        return meta is not None and meta.get("build") == self.build
+
+    @property
+    def n_tiles(self):
+        return -(-len(self.site_ids) // self.tile_sites)
+
+    def _tile_shape(self):
+        return (self.tile_sites, len(self.dates), self.n_pixels)
+
+    def _tile_file(self, t):
+        return self.tile_dir / f"tile_{t:05d}.f32"
+
+    def _tile(self, t):
+        arr = self._tiles.get(t)
+        if arr is None:
+            arr = np.memmap(self._tile_file(t), dtype=np.float32, mode=self.mode, shape=self._tile_shape())
+            self._tiles[t] = arr
+        return arr
+
+    def __contains__(self, site_id):
+        return site_id in self._site_index
+
+    def has_date(self, modis_date):
+        return modis_date in self._date_index
+
+    # --- Schreiben ------------------------------------------------------
+    def write(self, site_id, modis_date, values):
+        """Pixelwerte (skalierter NDVI) eines Standorts für einen Zeitpunkt schreiben."""
+        i = self._site_index[site_id]
+        j = self._date_index[modis_date]
+        values = np.asarray(values, dtype=np.float32)[: self.n_pixels]
+        row = self._tile(i // self.tile_sites)[i % self.tile_sites, j]
+        row[: len(values)] = values
+        row[len(values):] = np.nan
+
+    def flush(self):
+        for arr in self._tiles.values():
+            arr.flush()
+
+    # --- Lesen ----------------------------------------------------------
+    def pixels(self, site_id):
+        """Matrix Zeit × Pixel eines Standorts (View auf die Memory-Map)."""
+        i = self._site_index[site_id]
+        return self._tile(i // self.tile_sites)[i % self.tile_sites]
+
+    def series(self, site_id):
+        """NDVI-Zeitreihe (Mittel über alle gültigen Pixel) ohne leere Zeitpunkte."""
+        px = self.pixels(site_id)
+        valid = ~np.isnan(px)
+        counts = valid.sum(axis=1)
+        sums = np.where(valid, px, 0.0).sum(axis=1)
+        has_data = counts > 0
+        return pd.DataFrame({
+            "date": pd.to_datetime([d["calendar_date"] for d, ok in zip(self.dates, has_data) if ok]),
+            "ndvi": sums[has_data] / counts[has_data],
+        })
+
+    def latest(self, site_id):
+        """Letzter verfügbarer NDVI-Wert als (Kalenderdatum, NDVI) oder None."""
+        df = self.series(site_id)
+        if df.empty:
+            return None
+        last = df.iloc[-1]
+        return last["date"].date().isoformat(), float(last["ndvi"])
+
+
+def is_fresh(calendar_date, today=None, max_age_days=MAX_AGE_DAYS):
+    """True, wenn ein Kalenderdatum (ISO) höchstens `max_age_days` zurückliegt."""
+    today = today or date.today()
+    return (today - date.fromisoformat(calendar_date)).days <= max_age_days
+
+
+def _read_meta(path):
+    try:
+        return json.loads((Path(path) / META_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+@lru_cache(maxsize=4)
+def _open_cached(path, mtime_ns, inode):
+    # Schlüssel ändert sich mit jedem `publish()` (os.replace → neue Datei)
+    return NDVICube.open(path)
+
+
+def open_cube(path):
+    """
+    Würfel unter `path` öffnen, falls vorhanden – sonst None (Live-API
+    nutzen). Pro Aufruf wird nur `meta.json` geprüft; nach einem Neuaufbau
+    liefert der nächste Aufruf den neuen Lauf.
+    """
+    try:
+        st = (Path(path) / META_FILE).stat()
+    except FileNotFoundError:
+        return None
+    return _open_cached(str(path), st.st_mtime_ns, st.st_ino)
+
+
+def open_default_cube():
+    """`open_cube` für `DEFAULT_CUBE_DIR` bzw. `NIKKI_NDVI_CUBE`."""
+    return open_cube(DEFAULT_CUBE_DIR)
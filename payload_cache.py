@@ -0,0 +1,248 @@
+"""
+Kompakter Cache für Upstream-Antworten (Open-Meteo, MODIS).
+
+Antworten werden nicht als JSON, sondern als komprimierte Spalten-Blobs
+gespeichert:
+- Zahlenlisten → float32-/int-Arrays (None → NaN)
+- Zeitachsen (ISO-Strings unter `time`) → Startzeit + Schrittweite
+  bzw. datetime64-Array
+- alles andere bleibt in einem kleinen JSON-Kopf
+
+Beim Lesen werden die Arrays per `np.frombuffer` direkt auf den
+entpackten Puffer gelegt (keine Kopie). Die zurückgegebene Struktur
+entspricht dem JSON der API, nur mit NumPy-Arrays statt Listen.
+Komprimiert wird mit zstd, falls `zstandard` installiert ist, sonst zlib.
+
+Gleichzeitige Fehltreffer auf denselben Schlüssel lösen nur eine
+Upstream-Anfrage aus; die übrigen Aufrufer warten auf deren Ergebnis.
+"""
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import zlib
+from pathlib import Path
+
+import numpy as np
+import requests
+
+import cache_manager
+import scheduler
+from replay import request_key
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+CACHE_DIR = Path(os.environ.get("NIKKI_CACHE_DIR", Path(__file__).with_name("data") / "cache"))
+
+MAGIC = b"NKC1"
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+MIN_ARRAY_LEN = 4  # kürzere Listen bleiben im JSON-Kopf
+ALIGN = 8
+TIME_KEYS = ("time",)  # nur diese Felder werden als Zeitachse gelesen
+
+# Gültigkeitsdauer (s) je nach Art der Daten
+TTL_FORECAST = 15 * 60
+TTL_MODIS_DATES = 24 * 3600
+TTL_MODIS_SUBSET = 30 * 24 * 3600
+
+
+# -----------------------------------------------------------
+# KODIERUNG
+# -----------------------------------------------------------
+def _is_number(v):
+    return v is None or (isinstance(v, (int, float)) and not isinstance(v, bool))
+
+
+def _number_array(values):
+    if all(isinstance(v, int) for v in values):
+        for dtype in (np.int16, np.int32, np.int64):
+            info = np.iinfo(dtype)
+            if info.min <= min(values) and max(values) <= info.max:
+                return np.array(values, dtype=dtype)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float32)
+
+
+def _time_array(values):
+    """
+    ISO-Zeitstempel eines Zeitfelds (`TIME_KEYS`) als datetime64-Array,
+    None falls die Werte keine Zeitachse bilden.
+    Alle Werte müssen dieselbe Auflösung haben (z. B. nur Tage oder nur
+    Minuten) – gemischte Listen bleiben unverändert im JSON-Kopf.
+    """
+    first = values[0]
+    if not all(isinstance(v, str) and v[:1].isdigit() and len(v) == len(first) for v in values):
+        return None
+    try:
+        times = np.array(values, dtype="datetime64")
+        unit = np.datetime_data(np.datetime64(first).dtype)[0]
+    except ValueError:
+        return None
+    return times if np.datetime_data(times.dtype)[0] == unit else None
+
+
+class _Blocks:
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def add(self, arr):
+        ref = {"dtype": arr.dtype.str, "offset": self.size, "count": len(arr)}
+        data = arr.tobytes()
+        pad = -len(data) % ALIGN
+        self.parts.append(data + b"\0" * pad)
+        self.size += len(data) + pad
+        return ref
+
+
+def _pack(obj, blocks, key=None):
+    if isinstance(obj, dict):
+        return {k: _pack(v, blocks, k) for k, v in obj.items()}
+    if isinstance(obj, list) and len(obj) >= MIN_ARRAY_LEN:
+        if all(_is_number(v) for v in obj):
+            return {"$array": blocks.add(_number_array(obj))}
+        times = _time_array(obj) if key in TIME_KEYS else None
+        if times is not None:
+            steps = np.diff(times)
+            if (steps == steps[0]).all():
+                return {"$time": {"start": obj[0], "step": int(steps[0].astype(np.int64)), "count": len(obj)}}
+            return {"$array": blocks.add(times)}
+    if isinstance(obj, list):
+        return [_pack(v, blocks) for v in obj]
+    return obj
+
+
+def _unpack(obj, buf):
+    if isinstance(obj, dict):
+        if "$array" in obj:
+            ref = obj["$array"]
+            return np.frombuffer(buf, dtype=np.dtype(ref["dtype"]), count=ref["count"], offset=ref["offset"])
+        if "$time" in obj:
+            t = obj["$time"]
+            start = np.datetime64(t["start"])
+            return start + np.arange(t["count"]) * np.timedelta64(t["step"], np.datetime_data(start.dtype)[0])
+        return {k: _unpack(v, buf) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_unpack(v, buf) for v in obj]
+    return obj
+
+
+def encode_payload(data) -> bytes:
+    """API-Antwort (JSON-Struktur) in einen komprimierten Spalten-Blob umwandeln."""
+    blocks = _Blocks()
+    header = json.dumps(_pack(data, blocks), separators=(",", ":")).encode("utf-8")
+    header += b" " * (-(len(header) + 4) % ALIGN)
+    body = struct.pack("<I", len(header)) + header + b"".join(blocks.parts)
+
+    if zstandard is not None:
+        return MAGIC + bytes([CODEC_ZSTD]) + zstandard.ZstdCompressor(level=9).compress(body)
+    return MAGIC + bytes([CODEC_ZLIB]) + zlib.compress(body, 9)
+
+
+def decode_payload(blob):
+    """Blob zurück in die JSON-Struktur; Zahlenlisten als NumPy-Views."""
+    blob = memoryview(blob)
+    if blob[:4] != MAGIC:
+        raise ValueError("Kein Payload-Blob (falsche Kennung).")
+    codec = blob[4]
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Blob ist zstd-komprimiert, aber 'zstandard' ist nicht installiert.")
+        body = zstandard.ZstdDecompressor().decompress(blob[5:])
+    elif codec == CODEC_ZLIB:
+        body = zlib.decompress(blob[5:])
+    else:
+        raise ValueError(f"Unbekannter Codec {codec}.")
+
+    (header_len,) = struct.unpack_from("<I", body)
+    header = json.loads(bytes(body[4:4 + header_len]))
+    return _unpack(header, memoryview(body)[4 + header_len:])
+
+
+# -----------------------------------------------------------
+# PLATTEN-CACHE
+# -----------------------------------------------------------
+def _cache_file(key):
+    return CACHE_DIR / key[:2] / f"{key}.nkc"
+
+
+def _load(key, ttl):
+    """(Blob, Änderungszeit) aus dem Platten-Cache oder (None, None)."""
+    path = _cache_file(key)
+    try:
+        mtime = path.stat().st_mtime
+        if time.time() - mtime > ttl:
+            return None, None
+        return path.read_bytes(), mtime
+    except FileNotFoundError:
+        return None, None
+
+
+def load(key, ttl):
+    """Blob aus dem Cache lesen, falls vorhanden und jünger als `ttl` Sekunden."""
+    return _load(key, ttl)[0]
+
+
+def store(key, blob):
+    path = _cache_file(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, path)
+
+
+_flights = {}  # Schlüssel → [Lock, Anzahl Wartender]
+_flights_lock = threading.Lock()
+
+
+@contextmanager
+def _single_flight(key):
+    """Ein Lock pro Schlüssel, solange jemand darauf wartet oder lädt."""
+    with _flights_lock:
+        flight = _flights.setdefault(key, [threading.Lock(), 0])
+        flight[1] += 1
+    try:
+        with flight[0]:
+            yield
+    finally:
+        with _flights_lock:
+            flight[1] -= 1
+            if flight[1] == 0:
+                del _flights[key]
+
+
+def get_json(url, params=None, ttl=TTL_FORECAST, timeout=25, priority=scheduler.INTERACTIVE):
+    """
+    GET mit Cache: Treffer kommen aus dem Speicher-Cache (`cache_manager`)
+    oder vom Platten-Blob, sonst wird über den Scheduler geladen und
+    gespeichert – pro Schlüssel nur einmal, auch bei gleichzeitigen
+    Aufrufen. Nicht-200-Antworten lösen `requests.HTTPError` aus (und
+    werden nicht gecacht).
+    """
+    key = request_key(url, params)
+    memory = cache_manager.get_cache()
+    blob = memory.get(key, max_age=ttl)
+    if blob is cache_manager.MISSING:
+        with _single_flight(key):
+            # Ein anderer Aufrufer kann den Schlüssel inzwischen geladen haben
+            blob = memory.get(key, max_age=ttl)
+            if blob is cache_manager.MISSING:
+                blob, mtime = _load(key, ttl)
+                if blob is None:
+                    r = scheduler.get(url, params=params, timeout=timeout, priority=priority)
+                    if r.status_code != 200:
+                        r.raise_for_status()
+                        raise requests.HTTPError(f"HTTP {r.status_code}", response=r)
+                    blob = encode_payload(r.json())
+                    store(key, blob)
+                    mtime = time.time()
+                # Blob liegt bereits auf der Platte → beim Verdrängen nicht auslagern
+                memory.put(key, blob, ttl=ttl, spill=False, created=mtime)
+    return decode_payload(blob)
@@ -0,0 +1,181 @@
+"""
+Gewichtungsprofile je Portfolio und Sensitivitätstabellen.
+
+Die Teilrisiken (Vegetation, Dürre, Überflutung) werden einmal berechnet
+und in Snapshots gespeichert; das Gesamtrisiko ergibt sich erst bei der
+Abfrage aus den Gewichten des gewählten Profils (`portfolios.json`).
+Ein Profil kann optional auf eine Liste von Standorten beschränkt sein.
+
+Sensitivitätstabellen enthalten je Standort die Änderung des
+Gesamtscores, wenn ein Gewicht um ±Δ verschoben wird (die übrigen
+Gewichte werden anteilig angepasst, Summe bleibt 1). Damit sind
+Was-wäre-wenn-Fragen über tausende Standorte ein Tabellen-Lookup.
+
+Aufruf (Tabellen aus dem neuesten Snapshot erzeugen):
+    python portfolios.py --step 0.05 --steps 4
+"""
+import argparse
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import snapshots
+from risk_model import COMPONENTS, NO_DATA, risk_labels
+
+PORTFOLIOS_FILE = Path(__file__).with_name("portfolios.json")
+SENSITIVITY_DIR = Path(os.environ.get("NIKKI_SENSITIVITY", Path(__file__).with_name("data") / "sensitivity"))
+DEFAULT_PROFILE = "standard"
+
+
+class WeightProfile(NamedTuple):
+    name: str
+    label: str
+    weights: Tuple[float, float, float]  # Reihenfolge wie `COMPONENTS`
+    sites: Optional[Tuple[str, ...]] = None
+
+
+def load_profiles(path=PORTFOLIOS_FILE):
+    """
+    Profile aus JSON laden; Gewichte werden auf Summe 1 normiert.
+    Geänderte Dateien (mtime) werden ohne Neustart neu eingelesen.
+    """
+    return _read_profiles(str(path), os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=4)
+def _read_profiles(path, mtime_ns):
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    profiles = {}
+    for name, spec in raw.items():
+        w = np.array([float(spec["weights"][c]) for c in COMPONENTS])
+        if (w < 0).any() or w.sum() <= 0:
+            raise ValueError(f"Ungültige Gewichte im Profil '{name}': {spec['weights']}")
+        sites = spec.get("sites")
+        profiles[name] = WeightProfile(
+            name=name,
+            label=spec.get("label", name),
+            weights=tuple(float(x) for x in w / w.sum()),
+            sites=tuple(sites) if sites else None,
+        )
+    return profiles
+
+
+def get_profile(name=DEFAULT_PROFILE):
+    try:
+        return load_profiles()[name]
+    except KeyError:
+        raise KeyError(f"Unbekanntes Portfolio: {name}") from None
+
+
+# -----------------------------------------------------------
+# GESAMTRISIKO ZUR ABFRAGEZEIT
+# -----------------------------------------------------------
+def _select(components: pd.DataFrame, profile):
+    if profile.sites is None:
+        return components
+    return components[components["site_id"].isin(profile.sites)]
+
+
+def apply_profile(components: pd.DataFrame, profile):
+    """
+    Gesamtrisiko für `components` (Spalten `site_id` + `COMPONENTS`, z. B.
+    aus `SnapshotStore.scores_at()`) mit den Gewichten von `profile`.
+    Liefert eine Kopie mit `portfolio`, `total_risk`, `total_score` und `label`.
+    """
+    df = _select(components, profile).copy()
+    risk = df[list(COMPONENTS)].to_numpy(dtype=np.float64) @ np.asarray(profile.weights)
+    df["portfolio"] = profile.name
+    df["total_risk"] = risk
+    df["total_score"] = np.round(risk * 100)
+    df["label"] = risk_labels(df["total_score"], na_label=NO_DATA)
+    df.attrs["portfolio"] = profile.name
+    return df
+
+
+# -----------------------------------------------------------
+# SENSITIVITÄT
+# -----------------------------------------------------------
+def shifted_weights(weights, component, delta):
+    """
+    Gewicht `component` (Index) um `delta` verschieben, die übrigen
+    anteilig anpassen. Ergebnis bleibt im Bereich 0–1 mit Summe 1.
+    """
+    w = np.asarray(weights, dtype=np.float64)
+    target = float(np.clip(w[component] + delta, 0.0, 1.0))
+    rest = 1.0 - w[component]
+    out = w * ((1.0 - target) / rest) if rest > 0 else np.full_like(w, (1.0 - target) / (len(w) - 1))
+    out[component] = target
+    return out
+
+
+def sensitivity_table(components: pd.DataFrame, profile, step=0.05, steps=4):
+    """
+    Score-Änderung (Punkte 0–100) je Standort für alle Gewichtsverschiebungen
+    ±`step`·1…`steps` jedes Teilrisikos. Spalten: `site_id`, `base_score`
+    und je Variante `<teilrisiko><+Δ>`, z. B. `flood_risk+0.10`.
+    """
+    df = _select(components, profile)
+    risks = df[list(COMPONENTS)].to_numpy(dtype=np.float64)
+
+    deltas = [k * step for k in range(-steps, steps + 1) if k]
+    names, variants = [], []
+    for i, comp in enumerate(COMPONENTS):
+        for d in deltas:
+            names.append(f"{comp}{d:+.2f}")
+            variants.append(shifted_weights(profile.weights, i, d))
+
+    base = risks @ np.asarray(profile.weights) * 100
+    # Eine Matrixmultiplikation für alle Varianten: Standort × Variante
+    shifted = risks @ np.array(variants).T * 100
+    table = pd.DataFrame(shifted - base[:, None], columns=names, index=df.index)
+    table.insert(0, "base_score", base)
+    table.insert(0, "site_id", df["site_id"].to_numpy())
+    table.attrs["portfolio"] = profile.name
+    return table.reset_index(drop=True)
+
+
+def sensitivity_summary(table):
+    """Mittlere, minimale und maximale Score-Änderung je Variante."""
+    deltas = table.drop(columns=["site_id", "base_score"])
+    return deltas.agg(["mean", "min", "max"]).T
+
+
+def sensitivity_path(profile_name, root=SENSITIVITY_DIR):
+    return Path(root) / f"{profile_name}.parquet"
+
+
+def write_sensitivity(table, profile_name, root=SENSITIVITY_DIR):
+    path = sensitivity_path(profile_name, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    table.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def read_sensitivity(profile_name, root=SENSITIVITY_DIR):
+    """Vorberechnete Tabelle laden (None, falls noch nicht erzeugt)."""
+    path = sensitivity_path(profile_name, root)
+    return pd.read_parquet(path) if path.exists() else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sensitivitätstabellen je Portfolio aus dem neuesten Snapshot erzeugen.")
+    parser.add_argument("--profile", action="append", help="nur diese Profile (mehrfach möglich)")
+    parser.add_argument("--step", type=float, default=0.05)
+    parser.add_argument("--steps", type=int, default=4)
+    args = parser.parse_args()
+
+    components = snapshots.SnapshotStore().scores_at()
+    if components.empty:
+        raise SystemExit("Keine Snapshots vorhanden – zuerst batch_scoring.py ausführen.")
+    for name in args.profile or load_profiles():
+        table = sensitivity_table(components, get_profile(name), args.step, args.steps)
+        path = write_sensitivity(table, name)
+        print(f"{name}: {len(table)} Standorte → {path}")
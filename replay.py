@@ -0,0 +1,174 @@
+"""
+Aufzeichnen und Abspielen von Upstream-Antworten (Open-Meteo, MODIS).
+
+Der Transport sitzt unter dem Request-Scheduler: Im Modus `record` wird
+jede Antwort zusätzlich als Fixture auf die Platte geschrieben, im Modus
+`replay` werden ausschließlich Fixtures ausgeliefert – ohne Netzwerk und
+deterministisch. Für Lasttests lassen sich Latenz und Fehlerquote
+künstlich einstellen.
+
+Steuerung über Umgebungsvariablen (gilt für alle Apps und Batch-Läufe):
+    NIKKI_UPSTREAM=live|record|replay   (Standard: live)
+    NIKKI_FIXTURES=data/fixtures
+    NIKKI_REPLAY_LATENCY_MS=120         mittlere zusätzliche Latenz
+    NIKKI_REPLAY_JITTER_MS=40           ± gleichverteilte Streuung
+    NIKKI_REPLAY_ERROR_RATE=0.02        Anteil künstlicher Fehler
+    NIKKI_REPLAY_ERROR_STATUS=503       0 = Verbindungsfehler statt HTTP-Status
+    NIKKI_REPLAY_SEED=1
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+LIVE, RECORD, REPLAY = "live", "record", "replay"
+FIXTURE_DIR = Path(os.environ.get("NIKKI_FIXTURES", Path(__file__).with_name("data") / "fixtures"))
+
+# Nur diese Header werden gespeichert
+KEPT_HEADERS = ("Content-Type", "Retry-After")
+# Drosselungen sind keine Fixture, sondern Zustand des Upstreams
+NOT_RECORDED = (429, 503)
+
+
+class FixtureMissing(requests.ConnectionError):
+    """Im Replay-Modus gibt es für die Anfrage keine Aufzeichnung."""
+
+
+def request_key(url, params=None):
+    """Schlüssel einer GET-Anfrage – für Fixtures und den Payload-Cache."""
+    items = sorted((params or {}).items())
+    return hashlib.sha1(json.dumps([url, items], default=str).encode("utf-8")).hexdigest()
+
+
+def fixture_path(root, url, params=None):
+    host = urlsplit(url).hostname or "local"
+    return Path(root) / host / f"{request_key(url, params)}.json"
+
+
+def _response(url, status, headers, body):
+    res = requests.Response()
+    res.url = url
+    res.status_code = status
+    res.headers = CaseInsensitiveDict(headers)
+    res.encoding = "utf-8"
+    res._content = body
+    res._content_consumed = True  # iter_lines/iter_content lesen aus `_content`
+    return res
+
+
+class ReplayTransport:
+    """
+    Ersatz für `requests.get` (gleiche Signatur) mit Aufzeichnung bzw.
+    Wiedergabe. `latency_ms`/`jitter_ms` verzögern jede Antwort,
+    `error_rate` ersetzt einen Anteil der Antworten durch `error_status`
+    (bzw. einen Verbindungsfehler bei `error_status=0`).
+    """
+
+    def __init__(self, mode=REPLAY, root=FIXTURE_DIR, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, error_status=503, seed=None, send=None):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unbekannter Modus: {mode}")
+        self.mode = mode
+        self.root = Path(root)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.send = send or requests.get
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # Kennzahlen
+        self.calls = 0
+        self.misses = 0
+        self.injected_errors = 0
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+        return max(0.0, delay) / 1000.0, fail
+
+    def __call__(self, url, params=None, timeout=None, **kwargs):
+        delay, fail = self._draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            if not self.error_status:
+                raise requests.ConnectionError(f"Injizierter Verbindungsfehler: {url}")
+            return _response(url, self.error_status, {"Retry-After": "1"}, b"")
+
+        path = fixture_path(self.root, url, params)
+        if self.mode == RECORD:
+            return self._record(path, url, params, timeout, **kwargs)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            raise FixtureMissing(f"Keine Aufzeichnung für {url} {params or ''}") from None
+        return _response(url, data["status"], data["headers"], data["body"].encode("utf-8"))
+
+    def _record(self, path, url, params, timeout, **kwargs):
+        res = self.send(url, params=params, timeout=timeout, **kwargs)
+        body = res.content  # liest auch Streaming-Antworten vollständig
+        if res.status_code in NOT_RECORDED:
+            return res
+        record = {
+            "url": url,
+            "params": params,
+            "status": res.status_code,
+            "headers": {k: res.headers[k] for k in KEPT_HEADERS if k in res.headers},
+            "body": body.decode("utf-8", errors="replace"),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+        return res
+
+    def metrics(self):
+        return {"calls": self.calls, "misses": self.misses, "injected_errors": self.injected_errors}
+
+
+def transport_from_env(env=None):
+    """Transport gemäß `NIKKI_UPSTREAM` – im Live-Modus `requests.get`."""
+    env = os.environ if env is None else env
+    mode = env.get("NIKKI_UPSTREAM", LIVE).strip().lower()
+    if mode == LIVE:
+        return requests.get
+    seed = env.get("NIKKI_REPLAY_SEED")
+    return ReplayTransport(
+        mode=mode,
+        root=env.get("NIKKI_FIXTURES", FIXTURE_DIR),
+        latency_ms=float(env.get("NIKKI_REPLAY_LATENCY_MS", 0)),
+        jitter_ms=float(env.get("NIKKI_REPLAY_JITTER_MS", 0)),
+        error_rate=float(env.get("NIKKI_REPLAY_ERROR_RATE", 0)),
+        error_status=int(env.get("NIKKI_REPLAY_ERROR_STATUS", 503)),
+        seed=None if seed is None else int(seed),
+    )
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_transport():
+    """Prozessweiter Transport (einmal aus der Umgebung erzeugt)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = transport_from_env()
+        return _default
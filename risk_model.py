@@ -0,0 +1,257 @@
+"""
+Gemeinsame Risiko-Funktionen und Klassifikationen für die Apps und Hintergrunddienste.
+"""
+import numpy as np
+import pandas as pd
+
+NO_DATA = "⚪ Keine Daten"
+
+
+# -----------------------------------------------------------
+# VEKTORISIERTE KLASSIFIKATION
+# -----------------------------------------------------------
+def bin_codes(values, edges):
+    """
+    Klassen-Code je Wert = Anzahl der Schwellen `<=` Wert
+    (wie eine if/elif-Kette mit `x < schwelle`, `edges` aufsteigend).
+
+    `edges` ist entweder ein Vektor (gleiche Schwellen für alle Werte) oder
+    eine Matrix Wert × Schwellen (z. B. je Standort aus `CLIMATE_CONFIG`,
+    siehe `drought_edges`/`flood_edges`).
+    NaN landet – wie bei den skalaren Funktionen – in der obersten Klasse.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    edges = np.asarray(edges, dtype=np.float64)
+    if edges.ndim == 1:
+        return np.digitize(values, edges)
+    return (~(values[..., None] < edges)).sum(axis=-1)
+
+
+def _config_edges(cfg, keys, lower=()):
+    # Skalare (ein Standort) → Vektor, Spalten (viele Standorte) → Matrix Zeile × Schwellen
+    cols = [np.asarray(v, dtype=np.float64) for v in lower] + [np.asarray(cfg[k], dtype=np.float64) for k in keys]
+    return np.stack(np.broadcast_arrays(*cols), axis=-1)
+
+
+def classify_bins(values, edges, labels, na_label=None):
+    """
+    Werte als `pd.Categorical` mit `labels` einstufen.
+    Mit `na_label` erhalten fehlende Werte eine eigene Kategorie.
+    """
+    codes = bin_codes(values, edges)
+    categories = list(labels)
+    if na_label is not None:
+        codes = np.where(np.isnan(np.asarray(values, dtype=np.float64)), len(categories), codes)
+        categories.append(na_label)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+# -----------------------------------------------------------
+# SCORES & EINSTUFUNG
+# -----------------------------------------------------------
+def clamp01(x: float) -> float:
+    return max(0.0, min(1.0, float(x)))
+
+
+def risk_label(score_0_100: float) -> str:
+    if score_0_100 < 20:
+        return "🟢 Niedrig"
+    elif score_0_100 < 40:
+        return "🟡 Leicht erhöht"
+    elif score_0_100 < 65:
+        return "🟠 Erhöht"
+    elif score_0_100 < 85:
+        return "🔴 Hoch"
+    else:
+        return "🟥 Extrem"
+
+
+RISK_LABELS = ("🟢 Niedrig", "🟡 Leicht erhöht", "🟠 Erhöht", "🔴 Hoch", "🟥 Extrem")
+RISK_EDGES = (20, 40, 65, 85)
+
+
+def risk_labels(scores_0_100, na_label=None):
+    """Vektorisierte Variante von `risk_label` für ganze Spalten."""
+    return classify_bins(scores_0_100, RISK_EDGES, RISK_LABELS, na_label)
+
+
+# -----------------------------------------------------------
+# DÜRRE – Einstufung des Dürreindex (ET₀ – Niederschlag)
+# -----------------------------------------------------------
+DROUGHT_LABELS = ("🟢 Nass", "🟢 Normal", "🟠 Moderat", "🔴 Stark")
+DROUGHT_EDGES = (0, 1.5, 3)
+
+
+def drought_edges(cfg):
+    """Dürre-Schwellen (0, `drought_low`, `drought_high`) aus einer Klimazonen-Konfiguration."""
+    return _config_edges(cfg, ("drought_low", "drought_high"), lower=(0.0,))
+
+
+def classify_drought_series(values, edges=DROUGHT_EDGES):
+    """
+    Dürreindex (mm/Tag) einstufen: < 0 nass, < 1,5 normal, < 3 moderat,
+    sonst stark – bzw. nach `edges`, z. B. `drought_edges(registry.configs())`.
+    """
+    return classify_bins(values, edges, DROUGHT_LABELS)
+
+
+# -----------------------------------------------------------
+# RISIKO-FUNKTIONEN (0–1 Skala)
+# -----------------------------------------------------------
+def veg_risk_0_1(ndvi: float, cfg: dict) -> float:
+    """Vegetationsrisiko (0 = optimal, 1 = stark gestresst)."""
+    ndvi_opt = cfg["ndvi_opt"]
+    ndvi_min = cfg["ndvi_min"]
+    risk = (ndvi_opt - ndvi) / (ndvi_opt - ndvi_min)
+    return clamp01(risk)
+
+
+def drought_risk_0_1(d: float, cfg: dict) -> float:
+    """Dürre-Risiko basierend auf ET0 - Regen."""
+    low = cfg["drought_low"]
+    high = cfg["drought_high"]
+    if d <= low:
+        return 0.0
+    risk = (d - low) / (high - low)
+    return clamp01(risk)
+
+
+def flood_risk_0_1(p3h: float, p24h: float, cfg: dict) -> float:
+    """Flutrisiko, kombiniert aus 3h- und 24h-Regensummen."""
+    p3_med = cfg["flood_p3h_med"]
+    p3_high = cfg["flood_p3h_high"]
+    p24_med = cfg["flood_p24h_med"]
+    p24_high = cfg["flood_p24h_high"]
+
+    flash = 0.0
+    if p3h >= p3_med:
+        flash = (p3h - p3_med) / (p3_high - p3_med)
+    flash = clamp01(flash)
+
+    daily = 0.0
+    if p24h >= p24_med:
+        daily = (p24h - p24_med) / (p24_high - p24_med)
+    daily = clamp01(daily)
+
+    return max(flash, daily)
+
+
+# Gesamt-Risiko (Gewichtung) – Standardprofil, weitere in `portfolios.json`
+W_VEG, W_DROUGHT, W_FLOOD = 0.35, 0.40, 0.25
+DEFAULT_WEIGHTS = (W_VEG, W_DROUGHT, W_FLOOD)
+COMPONENTS = ("veg_risk", "drought_risk", "flood_risk")
+
+# Kennzahlen einer Standortbewertung (Batch, Dashboard, Snapshots)
+COLUMNS = ("ndvi", "drought", "p1h", "p3h", "p24h") + COMPONENTS + ("total_risk",)
+
+
+def total_risk_0_1(veg_risk: float, drought_risk: float, flood_risk: float, weights=DEFAULT_WEIGHTS) -> float:
+    """Gewichtete Summe der Teilrisiken (funktioniert auch mit Arrays)."""
+    w_veg, w_drought, w_flood = weights
+    return w_veg * veg_risk + w_drought * drought_risk + w_flood * flood_risk
+
+
+# Array-Varianten: `cfg` darf Skalare (ein Standort) oder Spalten
+# (z. B. `SiteRegistry.configs()`, ein Wert je Standort) enthalten.
+def veg_risk_array(ndvi, cfg):
+    ndvi = np.asarray(ndvi, dtype=np.float64)
+    return np.clip((cfg["ndvi_opt"] - ndvi) / (cfg["ndvi_opt"] - cfg["ndvi_min"]), 0.0, 1.0)
+
+
+def drought_risk_array(d, cfg):
+    d = np.asarray(d, dtype=np.float64)
+    risk = np.clip((d - cfg["drought_low"]) / (cfg["drought_high"] - cfg["drought_low"]), 0.0, 1.0)
+    return np.where(d <= cfg["drought_low"], 0.0, risk)
+
+
+def flood_risk_array(p3h, p24h, cfg):
+    p3h = np.asarray(p3h, dtype=np.float64)
+    p24h = np.asarray(p24h, dtype=np.float64)
+    flash = np.clip((p3h - cfg["flood_p3h_med"]) / (cfg["flood_p3h_high"] - cfg["flood_p3h_med"]), 0.0, 1.0)
+    daily = np.clip((p24h - cfg["flood_p24h_med"]) / (cfg["flood_p24h_high"] - cfg["flood_p24h_med"]), 0.0, 1.0)
+    return np.maximum(flash, daily)
+
+
+# -----------------------------------------------------------
+# ÜBERFLUTUNG – Starkregen-Stufen
+# -----------------------------------------------------------
+FLOOD_LABELS = ("🟢 Gering", "🟠 Moderat", "🔴 Hoch")
+
+# Untergrenzen für "Moderat" und "Hoch"
+FLASH_FLOOD_THRESHOLDS = (10, 20)   # mm / 3h
+DAILY_FLOOD_THRESHOLDS = (20, 50)   # mm / Tag
+
+
+def flood_edges(cfg, kind):
+    """
+    Starkregen-Schwellen (moderat, hoch) aus einer Klimazonen-Konfiguration,
+    `kind` = "p3h" (Flash) oder "p24h" (Tag) – statt der festen Schwellen oben.
+    """
+    return _config_edges(cfg, (f"flood_{kind}_med", f"flood_{kind}_high"))
+
+
+def flood_levels(values, thresholds):
+    """
+    Stufen-Codes (0 = gering, 1 = moderat, 2 = hoch) für beliebig viele Werte.
+    Fehlende Werte (NaN) erhalten -1.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    levels = bin_codes(values, thresholds).astype(np.int8)
+    levels[np.isnan(values)] = -1
+    return levels
+
+
+def flood_label(level) -> str:
+    return NO_DATA if level < 0 else FLOOD_LABELS[level]
+
+
+def classify_flash_flood(p3h: float) -> str:
+    """
+    Flash-Flood Risiko auf Basis 3-Stunden-Summe.
+    Grobe Schwellen (vereinfachtes Heuristik-Modell):
+      < 10 mm / 3h  → gering
+      10–20 mm / 3h → moderat
+      > 20 mm / 3h  → hoch
+    """
+    if p3h is None or pd.isna(p3h):
+        return NO_DATA
+    if p3h < 10:
+        return "🟢 Gering"
+    elif p3h < 20:
+        return "🟠 Moderat"
+    else:
+        return "🔴 Hoch"
+
+
+def classify_daily_flood(p24h: float) -> str:
+    """
+    Tagesflut-Risiko auf Basis 24-Stunden-Summe.
+    Grobe Schwellen:
+      < 20 mm / Tag → gering
+      20–50 mm      → moderat
+      > 50 mm       → hoch
+    """
+    if p24h is None or pd.isna(p24h):
+        return NO_DATA
+    if p24h < 20:
+        return "🟢 Gering"
+    elif p24h < 50:
+        return "🟠 Moderat"
+    else:
+        return "🔴 Hoch"
+
+
+def classify_flash_flood_series(p3h, thresholds=FLASH_FLOOD_THRESHOLDS):
+    """
+    Vektorisierte Variante von `classify_flash_flood`; `thresholds` auch je
+    Zeile, z. B. `flood_edges(registry.configs(), "p3h")`.
+    """
+    return classify_bins(p3h, thresholds, FLOOD_LABELS, NO_DATA)
+
+
+def classify_daily_flood_series(p24h, thresholds=DAILY_FLOOD_THRESHOLDS):
+    """
+    Vektorisierte Variante von `classify_daily_flood`; `thresholds` auch je
+    Zeile, z. B. `flood_edges(registry.configs(), "p24h")`.
+    """
+    return classify_bins(p24h, thresholds, FLOOD_LABELS, NO_DATA)
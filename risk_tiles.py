@@ -0,0 +1,433 @@
+"""
+Risiko-Kacheln: Teilrisiken über ein Lat/Lon-Raster als Kachelpyramide.
+
+Für eine Region (Bounding-Box) wird ein regelmäßiges Raster berechnet –
+ein Rasterpunkt je Pixel der Basis-Zoomstufe. Abgefragt wird dagegen
+nur ein gröberes Gitter im Abstand `WEATHER_GRID_DEG` (unabhängig von der
+Pixelgröße); Dürreindex, Starkregen und NDVI werden bilinear auf die
+Pixel interpoliert. Dürreindex und Starkregen kommen aus gebündelten
+Open-Meteo-Abfragen (bis zu `BATCH_SIZE` Koordinaten pro Anfrage); die
+Schwellenwerte stammen von der Klimazone des nächstgelegenen
+registrierten Standorts. Vegetation (MODIS) kostet eine Abfrage pro
+Gitterpunkt und wird nur mit `--ndvi` berechnet; ohne NDVI wird das
+Gesamtrisiko über die vorhandenen Teilrisiken normiert. Das
+Gesamtrisiko wird für jedes Portfolio (`portfolios.json`) als eigene
+Ebene geschrieben, damit das Dashboard der gewählten Gewichtung folgt.
+
+Kachelschema (geographisch, EPSG:4326): Zoomstufe z hat 2^(z+1) × 2^z
+Kacheln zu je 256 × 256 Pixeln. Die Kacheln werden fertig eingefärbt als
+PNG gespeichert (`<lauf>/<layer>/<z>/<x>/<y>.png`); gröbere Stufen
+entstehen durch 2×2-Mittelung der feineren. Jeder Lauf schreibt in ein
+eigenes Verzeichnis, `meta.json` verweist auf den aktuellen; abgelöste
+Läufe bleiben `BUILD_GRACE_S` lesbar (Dashboards mit älterem `meta.json`)
+und werden erst danach gelöscht. Das Dashboard liest nur noch Kacheln.
+
+Aufruf (Mitteleuropa, ca. 0,09° Auflösung):
+    python risk_tiles.py --bbox 45 5 55 16 --zoom 3
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import shutil
+import struct
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+import scheduler
+from cache_manager import MISSING, get_cache
+from indicators import BATCH_SIZE, WEATHER_PARAMS, batch_weather, fetch_batch, get_current_ndvi
+from portfolios import get_profile, load_profiles
+from risk_model import COMPONENTS, drought_risk_array, flood_risk_array, veg_risk_array
+from sites import THRESHOLD_KEYS, load_registry
+
+TILE_DIR = Path(os.environ.get("NIKKI_TILES", Path(__file__).with_name("data") / "tiles"))
+TILE_PX = 256
+MAX_ZOOM = 6           # ≈ 0,01° pro Pixel
+WEATHER_GRID_DEG = 0.1  # Abstand der Abfragepunkte (Wetter, NDVI, Klimazone)
+BUILD_GRACE_S = 600     # s – so lange bleibt ein abgelöster Lauf lesbar
+TOTAL = "total_risk"
+LAYER_NAMES = {
+    "total_risk": "Gesamtrisiko",
+    "veg_risk": "Vegetation",
+    "drought_risk": "Dürre",
+    "flood_risk": "Überflutung",
+}
+
+# Farbverlauf grün → gelb → rot (Risiko 0 → 0,5 → 1)
+_COLOR_STOPS = np.array([[26, 152, 80], [254, 224, 139], [215, 48, 39]], dtype=np.float64)
+ALPHA = 170
+
+
+# -----------------------------------------------------------
+# KACHELSCHEMA
+# -----------------------------------------------------------
+def tile_degrees(z):
+    return 180.0 / 2**z
+
+
+def pixel_degrees(z):
+    return tile_degrees(z) / TILE_PX
+
+
+def tile_bounds(z, x, y):
+    """(West, Süd, Ost, Nord) einer Kachel in Grad."""
+    size = tile_degrees(z)
+    west, north = -180.0 + x * size, 90.0 - y * size
+    return west, north - size, west + size, north
+
+
+def tiles_for_bbox(bbox, z):
+    """Alle Kachelindizes (x, y) der Stufe `z`, die `bbox` (Süd, West, Nord, Ost) berühren."""
+    south, west, north, east = bbox
+    size = tile_degrees(z)
+    x0, x1 = int((west + 180) // size), int(math.ceil((east + 180) / size))
+    y0, y1 = int((90 - north) // size), int(math.ceil((90 - south) / size))
+    return [
+        (x, y)
+        for y in range(max(y0, 0), min(y1, 2**z))
+        for x in range(max(x0, 0), min(x1, 2 ** (z + 1)))
+    ]
+
+
+def grid_for_bbox(bbox, z):
+    """
+    Pixelmittelpunkte der Stufe `z` in `bbox`.
+    Liefert (globaler Pixel-Ursprung (px, py), Breiten je Zeile, Längen je Spalte).
+    """
+    south, west, north, east = bbox
+    pix = pixel_degrees(z)
+    px0, px1 = math.floor((west + 180) / pix), math.ceil((east + 180) / pix)
+    py0, py1 = math.floor((90 - north) / pix), math.ceil((90 - south) / pix)
+    lons = -180.0 + (np.arange(px0, px1) + 0.5) * pix
+    lats = 90.0 - (np.arange(py0, py1) + 0.5) * pix
+    return (px0, py0), lats, lons
+
+
+def query_grid(bbox, z):
+    """
+    Abfragepunkte über `bbox` im Abstand `WEATHER_GRID_DEG` (höchstens so
+    dicht wie die Pixel der Stufe `z`). Liefert (Abstand, Breiten von Nord
+    nach Süd, Längen von West nach Ost); erster Punkt ist die Nordwestecke.
+    """
+    south, west, north, east = bbox
+    step = max(WEATHER_GRID_DEG, pixel_degrees(z))
+    lats = north - step * np.arange(math.ceil((north - south) / step) + 1)
+    lons = west + step * np.arange(math.ceil((east - west) / step) + 1)
+    return step, lats, lons
+
+
+def resample(values, bbox, step, lats, lons, method="bilinear"):
+    """
+    Werte des Abfragegitters (`query_grid`, Zeile × Spalte) auf die Punkte
+    `lats` × `lons` übertragen: bilinear, wo alle vier Nachbarn vorhanden
+    sind, sonst (und mit `method="nearest"`) vom nächsten Gitterpunkt.
+    Punkte außerhalb des Gitters erhalten den Randwert.
+    """
+    south, west, north, east = bbox
+    rows, cols = values.shape[:2]
+    fy = np.clip((north - np.asarray(lats)) / step, 0, rows - 1)
+    fx = np.clip((np.asarray(lons) - west) / step, 0, cols - 1)
+    nearest = values[np.rint(fy).astype(np.int64)][:, np.rint(fx).astype(np.int64)]
+    if method == "nearest":
+        return nearest
+
+    y0 = np.minimum(fy.astype(np.int64), max(rows - 2, 0))
+    x0 = np.minimum(fx.astype(np.int64), max(cols - 2, 0))
+    y1, x1 = np.minimum(y0 + 1, rows - 1), np.minimum(x0 + 1, cols - 1)
+    wy, wx = (fy - y0)[:, None], (fx - x0)[None, :]
+    top = values[y0][:, x0] * (1 - wx) + values[y0][:, x1] * wx
+    bottom = values[y1][:, x0] * (1 - wx) + values[y1][:, x1] * wx
+    bilinear = top * (1 - wy) + bottom * wy
+    return np.where(np.isnan(bilinear), nearest, bilinear)
+
+
+# -----------------------------------------------------------
+# DATEN
+# -----------------------------------------------------------
+def fetch_indicators(lats, lons):
+    """
+    Dürreindex (ET₀ − Regen des letzten Tages), 3h- und 24h-Regen für
+    mehrere Koordinaten – dieselben Größen wie `indicators.get_drought`
+    und `indicators.get_flood`, aber in einer Anfrage je Block.
+    """
+    drought, _, p3h, p24h = batch_weather(fetch_batch(lats, lons, WEATHER_PARAMS))
+    return drought, p3h, p24h
+
+
+def nearest_thresholds(registry, lats, lons):
+    """Schwellenwert-Matrix (Punkt × `THRESHOLD_KEYS`) des jeweils nächsten Standorts."""
+    return registry.thresholds[registry.nearest_indices(lats, lons)].astype(np.float64)
+
+
+def total_layer(profile_name):
+    """Ebenenname des Gesamtrisikos für ein Portfolio."""
+    return f"{TOTAL}.{profile_name}"
+
+
+def renormalized_total(risks, weights):
+    """
+    Gewichtetes Gesamtrisiko (Punkt × `COMPONENTS`) über die vorhandenen
+    Teilrisiken; fehlende (NaN) fallen heraus, die übrigen Gewichte werden
+    auf Summe 1 normiert.
+    """
+    weights = np.asarray(weights)
+    present = ~np.isnan(risks)
+    weight_sum = (present * weights).sum(axis=1)
+    return np.where(weight_sum > 0, np.nansum(risks * weights, axis=1) / np.where(weight_sum > 0, weight_sum, 1.0), np.nan)
+
+
+def compute_grid(bbox, z, profiles=None, with_ndvi=False, registry=None, chunk_size=BATCH_SIZE, fetch=fetch_indicators):
+    """
+    Teilrisiken und Gesamtrisiko je Portfolio (`profiles`, Standard: alle)
+    für alle Pixel der Stufe `z` in `bbox`. Abgefragt wird nur das
+    Gitter aus `query_grid`, die Werte werden auf die Pixel interpoliert.
+    Liefert (Pixel-Ursprung, {layer: Raster Zeile × Spalte},
+    fehlgeschlagene Blöcke). Gitterpunkte fehlgeschlagener Blöcke bleiben
+    NaN, ohne Nachbarwerte wird der Pixel transparent; ohne `with_ndvi`
+    fehlt die Vegetationsebene.
+    """
+    profiles = profiles or list(load_profiles().values())
+    registry = registry or load_registry()
+    origin, lats, lons = grid_for_bbox(bbox, z)
+    step, q_lats, q_lons = query_grid(bbox, z)
+    q_lat_flat = np.repeat(q_lats, len(q_lons))
+    q_lon_flat = np.tile(q_lons, len(q_lats))
+    n = q_lat_flat.size
+
+    drought = np.full(n, np.nan)
+    p3h = np.full(n, np.nan)
+    p24h = np.full(n, np.nan)
+    failed = 0
+    for s in range(0, n, chunk_size):
+        block = slice(s, min(s + chunk_size, n))
+        try:
+            drought[block], p3h[block], p24h[block] = fetch(q_lat_flat[block], q_lon_flat[block])
+        except Exception:
+            failed += 1
+
+    ndvi = np.full(n, np.nan)
+    if with_ndvi:
+        for i in range(n):
+            value = get_current_ndvi(float(q_lat_flat[i]), float(q_lon_flat[i]), priority=scheduler.BATCH)
+            ndvi[i] = np.nan if value is None else value
+
+    # Abfragegitter → Pixel (Klimazone ohne Interpolation)
+    q_shape = (len(q_lats), len(q_lons))
+
+    def to_pixels(values, method="bilinear"):
+        return resample(values.reshape(q_shape + values.shape[1:]), bbox, step, lats, lons, method)
+
+    drought, p3h, p24h, ndvi = (to_pixels(v).ravel() for v in (drought, p3h, p24h, ndvi))
+    thresholds = to_pixels(nearest_thresholds(registry, q_lat_flat, q_lon_flat), "nearest").reshape(-1, len(THRESHOLD_KEYS))
+    cfg = {key: thresholds[:, j] for j, key in enumerate(THRESHOLD_KEYS)}
+
+    risks = np.column_stack([
+        np.where(np.isnan(ndvi), np.nan, veg_risk_array(ndvi, cfg)),
+        np.where(np.isnan(drought), np.nan, drought_risk_array(drought, cfg)),
+        np.where(np.isnan(p3h) & np.isnan(p24h), np.nan, flood_risk_array(np.nan_to_num(p3h), np.nan_to_num(p24h), cfg)),
+    ])
+
+    shape = (len(lats), len(lons))
+    layers = {
+        name: risks[:, j].reshape(shape)
+        for j, name in enumerate(COMPONENTS)
+        if with_ndvi or name != "veg_risk"
+    }
+    for profile in profiles:
+        layers[total_layer(profile.name)] = renormalized_total(risks, profile.weights).reshape(shape)
+    return origin, layers, failed
+
+
+# -----------------------------------------------------------
+# RENDERING
+# -----------------------------------------------------------
+def colorize(values):
+    """Risiko 0–1 → RGBA (uint8); NaN wird transparent."""
+    v = np.clip(np.nan_to_num(values, nan=0.0), 0.0, 1.0) * (len(_COLOR_STOPS) - 1)
+    lo = np.minimum(v.astype(np.int64), len(_COLOR_STOPS) - 2)
+    frac = (v - lo)[..., None]
+    rgb = _COLOR_STOPS[lo] * (1 - frac) + _COLOR_STOPS[lo + 1] * frac
+    alpha = np.where(np.isnan(values), 0, ALPHA)[..., None]
+    return np.concatenate([rgb, alpha], axis=-1).round().astype(np.uint8)
+
+
+def encode_png(rgba):
+    """RGBA-Array (Höhe × Breite × 4) als PNG – ohne Bildbibliothek."""
+    h, w, _ = rgba.shape
+    raw = np.concatenate([np.zeros((h, 1), np.uint8), rgba.reshape(h, w * 4)], axis=1)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def downsample(raster, origin):
+    """Eine Stufe gröber: 2×2-Mittel (NaN-tolerant) auf gerade Pixelgrenzen ausgerichtet."""
+    px, py = origin
+    pad_x, pad_y = px % 2, py % 2
+    h, w = raster.shape
+    gh, gw = h + pad_y, w + pad_x
+    grid = np.full((gh + gh % 2, gw + gw % 2), np.nan)
+    grid[pad_y:gh, pad_x:gw] = raster
+    blocks = grid.reshape(grid.shape[0] // 2, 2, grid.shape[1] // 2, 2)
+    count = (~np.isnan(blocks)).sum(axis=(1, 3))
+    total = np.nansum(blocks, axis=(1, 3))
+    mean = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+    return mean, ((px - pad_x) // 2, (py - pad_y) // 2)
+
+
+# -----------------------------------------------------------
+# PYRAMIDE
+# -----------------------------------------------------------
+class TilePyramid:
+    """
+    Kachelpyramide auf der Platte: `meta.json` verweist auf den aktuellen
+    Lauf, dessen Kacheln unter `<root>/<lauf>/<layer>/<z>/<x>/<y>.png` liegen.
+    """
+
+    def __init__(self, root=TILE_DIR):
+        self.root = Path(root)
+
+    @property
+    def meta(self):
+        try:
+            return json.loads((self.root / "meta.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def tile_path(self, build, layer, z, x, y):
+        return self.root / build / layer / str(z) / str(x) / f"{y}.png"
+
+    def write(self, origin, layers, z, bbox, profiles, with_ndvi=False):
+        """
+        Alle Stufen z…0 in ein neues Laufverzeichnis schreiben, danach
+        `meta.json` umstellen. Der abgelöste Lauf bleibt `BUILD_GRACE_S`
+        lesbar (`retired` in `meta.json`); Läufe, deren Frist abgelaufen
+        ist, werden gelöscht (keine veralteten Kacheln außerhalb der neuen
+        `bbox`). Liefert die Anzahl Kacheln.
+        """
+        computed_at = datetime.now(timezone.utc)
+        build = f"{computed_at:%Y%m%dT%H%M%S%fZ}"
+        written = 0
+        for layer, raster in layers.items():
+            level_origin, level = origin, raster
+            for zoom in range(z, -1, -1):
+                written += self._write_level(build, layer, zoom, level, level_origin)
+                level, level_origin = downsample(level, level_origin)
+
+        # Abgelöste Läufe mit Zeitpunkt der Ablösung; abgelaufene fallen heraus
+        now = time.time()
+        previous = self.meta or {}
+        retired = dict(previous.get("retired", {}))
+        if previous.get("build"):
+            retired[previous["build"]] = now
+        retired = {b: t for b, t in retired.items() if now - t <= BUILD_GRACE_S}
+
+        meta = {
+            "build": build,
+            "retired": retired,
+            "bbox": list(bbox),
+            "max_zoom": z,
+            "layers": [name for name in COMPONENTS if name in layers] + [TOTAL],
+            "profiles": list(profiles),
+            "ndvi": bool(with_ndvi),
+            "computed_at": computed_at.isoformat(timespec="seconds"),
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.root / "meta.json")
+        self._remove_builds(keep={build, *retired})
+        return written
+
+    def _remove_builds(self, keep):
+        for path in self.root.iterdir():
+            if path.is_dir() and path.name not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _write_level(self, build, layer, z, raster, origin):
+        px0, py0 = origin
+        h, w = raster.shape
+        written = 0
+        for ty in range(py0 // TILE_PX, (py0 + h - 1) // TILE_PX + 1):
+            for tx in range(px0 // TILE_PX, (px0 + w - 1) // TILE_PX + 1):
+                tile = np.full((TILE_PX, TILE_PX), np.nan)
+                # Ausschnitt des Rasters, der in diese Kachel fällt
+                gx0, gy0 = max(tx * TILE_PX, px0), max(ty * TILE_PX, py0)
+                gx1, gy1 = min((tx + 1) * TILE_PX, px0 + w), min((ty + 1) * TILE_PX, py0 + h)
+                tile[gy0 - ty * TILE_PX:gy1 - ty * TILE_PX, gx0 - tx * TILE_PX:gx1 - tx * TILE_PX] = raster[gy0 - py0:gy1 - py0, gx0 - px0:gx1 - px0]
+                if np.isnan(tile).all():
+                    continue
+                path = self.tile_path(build, layer, z, tx, ty)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(encode_png(colorize(tile)))
+                os.replace(tmp, path)
+                written += 1
+        return written
+
+    def tile_png(self, build, layer, z, x, y):
+        """PNG-Bytes einer Kachel (über den Speicher-Cache) oder None."""
+        key = ("tile", str(self.root), build, layer, z, x, y)
+        cache = get_cache()
+        png = cache.get(key)
+        if png is MISSING:
+            try:
+                png = self.tile_path(build, layer, z, x, y).read_bytes()
+            except FileNotFoundError:
+                png = None
+            cache.put(key, png, spill=False, nbytes=len(png) if png else 0)
+        return png
+
+    def tiles_in_view(self, layer, bbox, z, meta=None):
+        """[(Grenzen W/S/O/N, PNG-Daten-URL)] aller vorhandenen Kacheln in `bbox`."""
+        meta = meta or self.meta
+        if meta is None:
+            return []
+        out = []
+        for x, y in tiles_for_bbox(bbox, z):
+            png = self.tile_png(meta["build"], layer, z, x, y)
+            if png:
+                out.append((tile_bounds(z, x, y), "data:image/png;base64," + base64.b64encode(png).decode("ascii")))
+        return out
+
+
+def build(bbox, z, profile_names=None, with_ndvi=False, root=TILE_DIR):
+    """Raster berechnen und als Pyramide schreiben. Liefert (Kacheln, fehlgeschlagene Blöcke)."""
+    profiles = [get_profile(name) for name in profile_names or load_profiles()]
+    origin, layers, failed = compute_grid(bbox, z, profiles, with_ndvi)
+    written = TilePyramid(root).write(origin, layers, z, bbox, [p.name for p in profiles], with_ndvi)
+    return written, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Risiko-Kachelpyramide für eine Region berechnen.")
+    parser.add_argument("--bbox", type=float, nargs=4, required=True, metavar=("SÜD", "WEST", "NORD", "OST"))
+    parser.add_argument("--zoom", type=int, default=3, help=f"Basis-Zoomstufe (0–{MAX_ZOOM})")
+    parser.add_argument("--profile", action="append", help="nur diese Portfolios (mehrfach möglich, Standard: alle)")
+    parser.add_argument("--ndvi", action="store_true", help="Vegetationsrisiko über MODIS (eine Abfrage je Abfragepunkt)")
+    parser.add_argument("--root", default=TILE_DIR)
+    args = parser.parse_args()
+
+    if not 0 <= args.zoom <= MAX_ZOOM:
+        parser.error(f"--zoom muss zwischen 0 und {MAX_ZOOM} liegen")
+    _, lats, lons = grid_for_bbox(args.bbox, args.zoom)
+    step, q_lats, q_lons = query_grid(args.bbox, args.zoom)
+    print(
+        f"{lats.size * lons.size} Rasterpunkte ({pixel_degrees(args.zoom):.3f}° Auflösung) aus "
+        f"{q_lats.size * q_lons.size} Abfragepunkten ({step:.3f}°) …"
+    )
+    written, failed = build(args.bbox, args.zoom, args.profile, args.ndvi, args.root)
+    print(f"{written} Kacheln geschrieben, {failed} Abfrageblöcke fehlgeschlagen → {args.root}")
@@ -0,0 +1,228 @@
+"""
+Rate-Limit-bewusster Request-Scheduler für die Upstream-APIs
+(NASA ORNL MODIS, Open-Meteo).
+
+Pro Host gibt es einen Token-Bucket. Anfragen warten in einer
+Prioritäts-Warteschlange: interaktive Seitenaufrufe (INTERACTIVE) werden
+immer vor Hintergrund-/Batch-Anfragen (BATCH) bedient. Antworten mit
+HTTP 429/503 sperren den Host für die per `Retry-After` angegebene Zeit
+und werden danach automatisch wiederholt.
+"""
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import replay
+
+INTERACTIVE = 0
+BATCH = 1
+
+# Host → (Anfragen pro Sekunde, Burst-Größe)
+HOST_LIMITS = {
+    "modis.ornl.gov": (2.0, 4),
+    "api.open-meteo.com": (8.0, 16),
+}
+DEFAULT_LIMIT = (5.0, 10)
+
+RETRY_STATUS = (429, 503)
+MAX_RETRIES = 3
+MAX_RETRY_AFTER = 120.0  # s – längere Sperren werden nicht abgewartet
+
+
+def parse_retry_after(value, now=None):
+    """
+    `Retry-After` in Sekunden umrechnen (Sekundenangabe oder HTTP-Datum).
+    Liefert None, wenn der Header fehlt oder unlesbar ist.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+# -----------------------------------------------------------
+# TOKEN-BUCKET PRO HOST
+# -----------------------------------------------------------
+class _HostBucket:
+    def __init__(self, rate, burst, now):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = now
+        self.blocked_until = 0.0
+        self.queue = []  # Heap aus (Priorität, Sequenznummer)
+
+        # Kennzahlen
+        self.requests = 0
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Wartezeit (s), bis das nächste Token frei ist."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def block(self, now, seconds):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0.0
+        self.throttled += 1
+
+
+class RequestScheduler:
+    """
+    Reiht HTTP-GETs pro Host ein und gibt sie im Rahmen des Rate-Limits frei.
+
+    `send` ist die eigentliche Transportfunktion (Standard: `requests.get`
+    bzw. Aufzeichnung/Replay laut `NIKKI_UPSTREAM`, siehe `replay.py`)
+    und muss dieselbe Signatur haben. `share` (0–1) teilt das Budget, wenn
+    mehrere Prozesse parallel denselben Host abfragen.
+
+    `clock` und `wait(cond, timeout)` ersetzen Uhr und Warten (Tests mit
+    Fake-Uhr); Standard sind `time.monotonic` und `Condition.wait`.
+    """
+
+    def __init__(self, limits=None, send=None, max_retries=MAX_RETRIES, share=1.0, clock=time.monotonic, wait=None):
+        self.limits = dict(HOST_LIMITS if limits is None else limits)
+        self.send = send or replay.default_transport()
+        self.max_retries = max_retries
+        self.share = share
+        self.clock = clock
+        self._wait = wait or (lambda cond, timeout: cond.wait(timeout))
+        self._cond = threading.Condition()
+        self._buckets = {}
+        self._seq = itertools.count()
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.limits.get(host, DEFAULT_LIMIT)
+            bucket = _HostBucket(rate * self.share, max(1, int(burst * self.share)), self.clock())
+            self._buckets[host] = bucket
+        return bucket
+
+    def _acquire(self, host, priority):
+        with self._cond:
+            bucket = self._bucket(host)
+            ticket = (priority, next(self._seq))
+            heapq.heappush(bucket.queue, ticket)
+            start = self.clock()
+            try:
+                while True:
+                    now = self.clock()
+                    bucket.refill(now)
+                    timeout = None
+                    if bucket.queue[0] == ticket:
+                        timeout = bucket.delay(now)
+                        if timeout <= 0:
+                            break
+                    self._wait(self._cond, timeout)
+            except BaseException:
+                bucket.queue.remove(ticket)
+                heapq.heapify(bucket.queue)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(bucket.queue)
+            bucket.tokens -= 1.0
+            bucket.requests += 1
+            waited = self.clock() - start
+            bucket.wait_total += waited
+            bucket.wait_max = max(bucket.wait_max, waited)
+            # Nächster Kandidat in der Warteschlange darf prüfen
+            self._cond.notify_all()
+
+    def _throttle(self, host, seconds):
+        with self._cond:
+            self._bucket(host).block(self.clock(), seconds)
+            self._cond.notify_all()
+
+    def get(self, url, params=None, timeout=25, priority=INTERACTIVE, **kwargs):
+        """
+        GET über den Scheduler. Bei 429/503 wird `Retry-After` (bzw. ein
+        exponentieller Backoff) abgewartet und erneut gesendet; nach
+        `max_retries` Versuchen wird die letzte Antwort zurückgegeben.
+        Weitere Keyword-Argumente (z. B. `stream=True`) gehen an `send`.
+        """
+        host = urlsplit(url).hostname or ""
+        for attempt in range(self.max_retries + 1):
+            self._acquire(host, priority)
+            res = self.send(url, params=params, timeout=timeout, **kwargs)
+            if res.status_code not in RETRY_STATUS:
+                return res
+
+            wait = parse_retry_after(res.headers.get("Retry-After"))
+            if wait is None:
+                wait = 2.0 ** attempt
+            if wait > MAX_RETRY_AFTER:
+                return res
+            if attempt < self.max_retries:
+                res.close()  # Verbindung freigeben, die Antwort wird verworfen
+            self._throttle(host, wait)
+        return res
+
+    def metrics(self):
+        """Kennzahlen je Host: Warteschlangentiefe, Wartezeiten, Drosselungen."""
+        with self._cond:
+            now = self.clock()
+            out = {}
+            for host, b in self._buckets.items():
+                out[host] = {
+                    "queue_depth": len(b.queue),
+                    "queue_interactive": sum(1 for p, _ in b.queue if p == INTERACTIVE),
+                    "queue_batch": sum(1 for p, _ in b.queue if p != INTERACTIVE),
+                    "requests": b.requests,
+                    "throttled": b.throttled,
+                    "blocked_for_s": max(0.0, b.blocked_until - now),
+                    "wait_total_s": b.wait_total,
+                    "wait_avg_s": b.wait_total / b.requests if b.requests else 0.0,
+                    "wait_max_s": b.wait_max,
+                }
+            return out
+
+
+# -----------------------------------------------------------
+# PROZESSWEITER STANDARD-SCHEDULER
+# -----------------------------------------------------------
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RequestScheduler()
+        return _default
+
+
+def set_scheduler(instance: RequestScheduler):
+    """Prozessweiten Scheduler ersetzen (z. B. in Worker-Prozessen)."""
+    global _default
+    with _default_lock:
+        _default = instance
+
+
+def get(url, params=None, timeout=25, priority=INTERACTIVE, **kwargs):
+    """Kurzform für `get_scheduler().get(...)`."""
+    return get_scheduler().get(url, params=params, timeout=timeout, priority=priority, **kwargs)
@@ -0,0 +1,255 @@
+"""
+Standort-Register für alle Apps.
+
+Alle Standorte liegen spaltenweise in NumPy-Arrays (ID, Koordinaten,
+Klimazonen-Code, Schwellenwerte). Dadurch bleibt das Register auch mit
+100k+ Standorten klein im Speicher und lässt sich direkt für Batch-Läufe
+vektorisiert verwenden.
+"""
+import csv
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+DEFAULT_SITES_FILE = Path(__file__).with_name("sites.csv")
+
+# -----------------------------------------------------------
+# KLIMAZONEN & SCHWELLENWERTE
+# -----------------------------------------------------------
+# Klimaspezifische Parameter für das Risikomodell
+CLIMATE_CONFIG = {
+    "temperate": {
+        "ndvi_opt": 0.60,
+        "ndvi_min": 0.20,
+        "drought_low": 0.5,
+        "drought_high": 3.0,
+        "flood_p3h_med": 10,
+        "flood_p3h_high": 25,
+        "flood_p24h_med": 20,
+        "flood_p24h_high": 50,
+        "soil_capacity_mm": 150,
+    },
+    "semi_arid": {
+        "ndvi_opt": 0.40,
+        "ndvi_min": 0.10,
+        "drought_low": 2.0,
+        "drought_high": 6.0,
+        "flood_p3h_med": 5,
+        "flood_p3h_high": 15,
+        "flood_p24h_med": 10,
+        "flood_p24h_high": 30,
+        "soil_capacity_mm": 80,
+    },
+    "tropical_humid": {
+        "ndvi_opt": 0.80,
+        "ndvi_min": 0.40,
+        "drought_low": 1.0,
+        "drought_high": 5.0,
+        "flood_p3h_med": 10,
+        "flood_p3h_high": 30,
+        "flood_p24h_med": 25,
+        "flood_p24h_high": 80,
+        "soil_capacity_mm": 200,
+    },
+    "tropical_monsoon": {
+        "ndvi_opt": 0.75,
+        "ndvi_min": 0.35,
+        "drought_low": 1.0,
+        "drought_high": 5.0,
+        "flood_p3h_med": 8,
+        "flood_p3h_high": 25,
+        "flood_p24h_med": 20,
+        "flood_p24h_high": 70,
+        "soil_capacity_mm": 180,
+    },
+}
+
+# Klimazonen-Code = Position in diesem Tupel
+CLIMATE_ZONES = tuple(CLIMATE_CONFIG)
+DEFAULT_CLIMATE = "temperate"
+
+# Spaltenreihenfolge der Schwellenwert-Matrix
+THRESHOLD_KEYS = tuple(CLIMATE_CONFIG[DEFAULT_CLIMATE])
+
+# Schwellenwerte je Klimazone als Matrix (Zone × Schwellenwert)
+_ZONE_THRESHOLDS = np.array(
+    [[CLIMATE_CONFIG[zone][key] for key in THRESHOLD_KEYS] for zone in CLIMATE_ZONES],
+    dtype=np.float32,
+)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def _as_float(v) -> float:
+    # str() liefert die kürzeste float32-Darstellung (0.6 statt 0.6000000238)
+    return float(str(v))
+
+
+class Site(NamedTuple):
+    id: str
+    name: str
+    lat: float
+    lon: float
+    climate: str
+
+
+# -----------------------------------------------------------
+# REGISTER
+# -----------------------------------------------------------
+class SiteRegistry:
+    """
+    Spaltenbasiertes Standort-Register.
+
+    - `ids`, `names`: Bezeichner je Standort
+    - `lat`, `lon`: Koordinaten (float32)
+    - `climate_code`: Index in `CLIMATE_ZONES` (uint8)
+    - `thresholds`: Matrix Standort × `THRESHOLD_KEYS` (float32)
+    """
+
+    def __init__(self, ids, names, lat, lon, climate_code, thresholds=None):
+        self.ids = np.asarray(ids, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.lat = np.asarray(lat, dtype=np.float32)
+        self.lon = np.asarray(lon, dtype=np.float32)
+        self.climate_code = np.asarray(climate_code, dtype=np.uint8)
+
+        if thresholds is None:
+            thresholds = _ZONE_THRESHOLDS[self.climate_code]
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+
+        n = len(self.ids)
+        for arr in (self.names, self.lat, self.lon, self.climate_code):
+            if len(arr) != n:
+                raise ValueError("Alle Spalten des Registers müssen gleich lang sein.")
+        if self.thresholds.shape != (n, len(THRESHOLD_KEYS)):
+            raise ValueError("Schwellenwert-Matrix passt nicht zur Anzahl der Standorte.")
+
+        # ID → Zeilenindex für O(1)-Zugriff
+        self._index = {site_id: i for i, site_id in enumerate(self.ids)}
+        if len(self._index) != n:
+            raise ValueError("Standort-IDs müssen eindeutig sein.")
+
+    # --- Aufbau ---------------------------------------------------------
+    @classmethod
+    def from_records(cls, records):
+        """
+        Baut das Register aus Dicts mit `id`, `lat`, `lon` und optional
+        `name`, `climate` sowie einzelnen Schwellenwerten (überschreiben
+        die Werte der Klimazone).
+        """
+        ids, names, lat, lon, codes, rows = [], [], [], [], [], []
+        for rec in records:
+            climate = rec.get("climate") or DEFAULT_CLIMATE
+            if climate not in CLIMATE_CONFIG:
+                raise ValueError(f"Unbekannte Klimazone '{climate}' für Standort {rec['id']}.")
+            code = CLIMATE_ZONES.index(climate)
+
+            row = _ZONE_THRESHOLDS[code].copy()
+            for j, key in enumerate(THRESHOLD_KEYS):
+                value = rec.get(key)
+                if value not in (None, ""):
+                    row[j] = float(value)
+
+            ids.append(rec["id"])
+            names.append(rec.get("name") or rec["id"])
+            lat.append(float(rec["lat"]))
+            lon.append(float(rec["lon"]))
+            codes.append(code)
+            rows.append(row)
+
+        thresholds = np.vstack(rows) if rows else np.empty((0, len(THRESHOLD_KEYS)), np.float32)
+        return cls(ids, names, lat, lon, codes, thresholds)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Liest das Register aus einer CSV-Datei (Spalten wie `from_records`)."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_records(csv.DictReader(f))
+
+    # --- Zugriff --------------------------------------------------------
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, site_id):
+        return site_id in self._index
+
+    def index(self, site_id) -> int:
+        """Zeilenindex eines Standorts (KeyError, falls unbekannt)."""
+        return self._index[site_id]
+
+    def site(self, site_id) -> Site:
+        i = self._index[site_id]
+        return self._site_at(i)
+
+    def name(self, site_id) -> str:
+        return self.names[self._index[site_id]]
+
+    def coords(self, site_id):
+        i = self._index[site_id]
+        return _as_float(self.lat[i]), _as_float(self.lon[i])
+
+    def climate(self, site_id) -> str:
+        return CLIMATE_ZONES[self.climate_code[self._index[site_id]]]
+
+    def config(self, site_id) -> dict:
+        """Schwellenwerte eines Standorts als Dict (wie `CLIMATE_CONFIG[zone]`)."""
+        row = self.thresholds[self._index[site_id]]
+        return {key: _as_float(v) for key, v in zip(THRESHOLD_KEYS, row)}
+
+    def configs(self) -> dict:
+        """Schwellenwerte aller Standorte als Spalten (für die Array-Funktionen in `risk_model`)."""
+        return {key: self.thresholds[:, j] for j, key in enumerate(THRESHOLD_KEYS)}
+
+    def threshold(self, key):
+        """Spalte eines Schwellenwerts für alle Standorte (View, keine Kopie)."""
+        return self.thresholds[:, THRESHOLD_KEYS.index(key)]
+
+    # --- Räumliche Suche ------------------------------------------------
+    def distances_km(self, lat, lon):
+        """
+        Haversine-Distanz (km) von (lat, lon) zu allen Standorten; für
+        Arrays von Punkten eine Matrix Punkt × Standort.
+        """
+        lat1 = np.radians(np.asarray(lat, dtype=np.float64))[..., None]
+        lon1 = np.radians(np.asarray(lon, dtype=np.float64))[..., None]
+        lat2 = np.radians(self.lat, dtype=np.float64)
+        dlat = lat2 - lat1
+        dlon = np.radians(self.lon, dtype=np.float64) - lon1
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def nearest_index(self, lat, lon) -> int:
+        if len(self) == 0:
+            raise LookupError("Register enthält keine Standorte.")
+        return int(np.argmin(self.distances_km(lat, lon)))
+
+    def nearest_indices(self, lats, lons, chunk=1000):
+        """Index des jeweils nächsten Standorts für viele Punkte (blockweise, begrenzter Speicher)."""
+        if len(self) == 0:
+            raise LookupError("Register enthält keine Standorte.")
+        lats, lons = np.asarray(lats), np.asarray(lons)
+        out = np.empty(len(lats), dtype=np.int64)
+        for s in range(0, len(lats), chunk):
+            out[s:s + chunk] = np.argmin(self.distances_km(lats[s:s + chunk], lons[s:s + chunk]), axis=1)
+        return out
+
+    def nearest(self, lat, lon) -> Site:
+        """Nächstgelegener registrierter Standort zu einer Koordinate."""
+        return self._site_at(self.nearest_index(lat, lon))
+
+    def _site_at(self, i) -> Site:
+        return Site(
+            self.ids[i],
+            self.names[i],
+            _as_float(self.lat[i]),
+            _as_float(self.lon[i]),
+            CLIMATE_ZONES[self.climate_code[i]],
+        )
+
+
+@lru_cache(maxsize=None)
+def load_registry(path=DEFAULT_SITES_FILE) -> SiteRegistry:
+    """Lädt (einmal pro Prozess) das Standort-Register aus `sites.csv`."""
+    return SiteRegistry.from_csv(path)
@@ -0,0 +1,258 @@
+"""
+Versionierte Snapshots der berechneten Risiko-Scores + lokale Lese-API.
+
+Jeder Lauf (Batch-Bewertung oder Dashboard) schreibt eine Parquet-Datei
+mit Standort, Zeitpunkt, Portfolio, Einzelindikatoren, Teilrisiken und
+Gesamtscore. `SnapshotStore` lädt neue Snapshots inkrementell, sortiert
+nach Standort und Zeit und beantwortet Abfragen über vorberechnete
+Indizes (Standort → Zeilenbereich, Standort + Zeit → Binärsuche) in
+Millisekunden.
+
+Schema-Versionen liegen in eigenen Verzeichnissen (`v1/`, `v2/`, …).
+v1-Dateien ohne Spalte `portfolio` werden beim Lesen mit dem
+Standardprofil ergänzt.
+
+Aufruf (Lese-API):
+    python snapshots.py --port 8600
+    GET /snapshots                       → Liste aller Snapshots
+    GET /sites/<id>/latest               → letzter Score eines Standorts
+    GET /sites/<id>/history?start=&end=  → Verlauf eines Standorts
+    GET /scores?at=<ISO-Zeit>            → alle Standorte zum Zeitpunkt
+    GET /scores?portfolio=<name>         → Gesamtscore mit Portfolio-Gewichten
+    GET /portfolios/<name>/sensitivity   → vorberechnete Sensitivitätstabelle
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import portfolios
+from risk_model import COLUMNS
+
+SCHEMA_VERSION = 2  # v2: Spalte `portfolio`
+SNAPSHOT_DIR = Path(os.environ.get("NIKKI_SNAPSHOTS", Path(__file__).with_name("data") / "snapshots"))
+# `portfolio`: Gewichtungsprofil, mit dem `total_risk`/`total_score` berechnet wurden
+SNAPSHOT_COLUMNS = ("site_id", "computed_at", "portfolio") + COLUMNS + ("total_score",)
+
+
+def _version_dir(root, version=SCHEMA_VERSION):
+    return Path(root) / f"v{version}"
+
+
+def _snapshot_files(root):
+    """Snapshot-Dateien aller Schema-Versionen."""
+    return tuple(sorted(
+        f for version in range(1, SCHEMA_VERSION + 1)
+        for f in _version_dir(root, version).glob("scores-*.parquet")
+    ))
+
+
+def _read_snapshot(path):
+    df = pd.read_parquet(path)
+    if "portfolio" not in df:  # v1: Gesamtrisiko immer mit Standardgewichten
+        df.insert(2, "portfolio", portfolios.DEFAULT_PROFILE)
+    return df[list(SNAPSHOT_COLUMNS)]
+
+
+def _ns(values):
+    """UTC-Zeitpunkte (Series oder Timestamp) als int64-Nanosekunden."""
+    if isinstance(values, pd.Timestamp):
+        return values.tz_convert("UTC").as_unit("ns").value
+    return values.dt.tz_convert("UTC").dt.as_unit("ns").astype("int64").to_numpy()
+
+
+def write_snapshot(scores: pd.DataFrame, computed_at=None, root=SNAPSHOT_DIR, portfolio=None):
+    """
+    Scores (Spalten wie `batch_scoring.score_all`) als neuen Snapshot
+    speichern; `portfolio` ist das Profil des Gesamtrisikos (Standard:
+    `portfolios.DEFAULT_PROFILE`). Liefert den Pfad der geschriebenen Datei.
+    """
+    computed_at = _ts(computed_at or datetime.now(timezone.utc))
+    df = scores.copy()
+    df["computed_at"] = computed_at
+    df["portfolio"] = portfolio or portfolios.DEFAULT_PROFILE
+    df["site_id"] = df["site_id"].astype(str)
+    df = df[list(SNAPSHOT_COLUMNS)]
+
+    out_dir = _version_dir(root)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"scores-{computed_at:%Y%m%dT%H%M%S%fZ}.parquet"
+    tmp = path.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+# -----------------------------------------------------------
+# LESEN
+# -----------------------------------------------------------
+class SnapshotStore:
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = Path(root)
+        self._files = ()
+        self._lock = threading.Lock()
+        # (Frame, Standort → Zeilenbereich, Zeitindex) – nur als Ganzes
+        # ersetzt, damit parallele Leser nie Frame und Index verschiedener
+        # Stände mischen
+        self._state = _index(pd.DataFrame(columns=list(SNAPSHOT_COLUMNS)))
+        self.refresh()
+
+    @property
+    def df(self):
+        return self._state[0]
+
+    def refresh(self):
+        """
+        Neue Snapshots seit dem letzten Aufruf nachladen (nur die neuen
+        Dateien); fehlt eine bekannte Datei, wird alles neu gelesen.
+        """
+        files = _snapshot_files(self.root)
+        if files == self._files:
+            return
+        with self._lock:
+            known = set(self._files)
+            if known <= set(files):
+                frames = [self.df] if len(self.df) else []
+                frames += [_read_snapshot(f) for f in files if f not in known]
+            else:
+                frames = [_read_snapshot(f) for f in files]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(SNAPSHOT_COLUMNS))
+            self._state = _index(df)
+            self._files = files
+
+    def snapshots(self):
+        """Zeitpunkte aller Snapshots mit Anzahl Standorte."""
+        counts = self.df.groupby("computed_at").size()
+        return [{"computed_at": t.isoformat(), "sites": int(n)} for t, n in counts.items()]
+
+    def history(self, site_id, start=None, end=None):
+        """Alle Snapshot-Zeilen eines Standorts (optional im Zeitfenster)."""
+        df, site_rows, _ = self._state
+        lo, hi = site_rows.get(site_id, (0, 0))
+        rows = df.iloc[lo:hi]
+        if start is not None or end is not None:
+            times = rows["computed_at"]
+            a = 0 if start is None else times.searchsorted(_ts(start), side="left")
+            b = len(rows) if end is None else times.searchsorted(_ts(end), side="right")
+            rows = rows.iloc[a:b]
+        return rows
+
+    def latest(self, site_id):
+        rows = self.history(site_id)
+        return None if rows.empty else rows.iloc[-1]
+
+    def scores_at(self, at=None):
+        """Letzter Snapshot-Stand aller Standorte zum Zeitpunkt `at` (Standard: jetzt)."""
+        df, _, (site_first, row_keys, times) = self._state
+        if df.empty:
+            return df
+        last = np.append(site_first[1:], len(df)) - 1
+        if at is None:
+            return df.iloc[last]
+        # Zeilen sind nach (Standort, Zeit) sortiert: Schlüssel = Standort-Code × Zeit-Rang
+        rank = np.searchsorted(times, _ns(_ts(at)), side="right") - 1
+        if rank < 0:
+            return df.iloc[:0]
+        codes = np.arange(len(site_first), dtype=np.int64)
+        pos = np.searchsorted(row_keys, codes * (len(times) + 1) + rank, side="right") - 1
+        return df.iloc[pos[pos >= site_first]]
+
+
+def _index(df):
+    """Frame nach (Standort, Zeit) sortieren und die Such-Indizes aufbauen."""
+    df = df.sort_values(["site_id", "computed_at"], kind="stable").reset_index(drop=True)
+
+    # Standort → Zeilenbereich [start, stop) im sortierten Frame
+    ids = df["site_id"].to_numpy()
+    uniq, first, codes = np.unique(ids, return_index=True, return_inverse=True)
+    bounds = np.append(first, len(ids))
+    site_rows = {s: (bounds[i], bounds[i + 1]) for i, s in enumerate(uniq)}
+
+    # Zeitindex: aufsteigende Schlüssel Standort-Code × (Anzahl Zeiten + 1) + Zeit-Rang
+    ns = _ns(df["computed_at"]) if len(df) else np.empty(0, np.int64)
+    times = np.unique(ns)
+    row_keys = codes.astype(np.int64) * (len(times) + 1) + np.searchsorted(times, ns)
+    return df, site_rows, (first, row_keys, times)
+
+
+def _ts(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+# -----------------------------------------------------------
+# LOKALE HTTP-API
+# -----------------------------------------------------------
+def _records(df):
+    out = df.astype(object).where(df.notna(), None)
+    out["computed_at"] = df["computed_at"].map(lambda t: t.isoformat())
+    return out.to_dict(orient="records")
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            q = {k: v[0] for k, v in parse_qs(parts.query).items()}
+            path = [unquote(p) for p in parts.path.strip("/").split("/")]
+            store.refresh()
+            try:
+                if path == ["snapshots"]:
+                    return self._json(200, store.snapshots())
+                if path == ["scores"]:
+                    scores = store.scores_at(q.get("at"))
+                    if "portfolio" in q:
+                        scores = portfolios.apply_profile(scores, portfolios.get_profile(q["portfolio"]))
+                    return self._json(200, _records(scores))
+                if len(path) == 3 and path[0] == "portfolios" and path[2] == "sensitivity":
+                    table = portfolios.read_sensitivity(path[1])
+                    if table is None:
+                        return self._json(404, {"error": f"Keine Sensitivitätstabelle für '{path[1]}'."})
+                    if "site" in q:
+                        table = table[table["site_id"] == q["site"]]
+                    return self._json(200, table.astype(object).where(table.notna(), None).to_dict(orient="records"))
+                if len(path) == 3 and path[0] == "sites":
+                    site_id, action = path[1], path[2]
+                    if action == "latest":
+                        row = store.latest(site_id)
+                        if row is None:
+                            return self._json(404, {"error": f"Keine Scores für '{site_id}'."})
+                        return self._json(200, _records(row.to_frame().T)[0])
+                    if action == "history":
+                        return self._json(200, _records(store.history(site_id, q.get("start"), q.get("end"))))
+            except (KeyError, ValueError) as e:
+                return self._json(400, {"error": str(e)})
+            self._json(404, {"error": "Unbekannter Endpunkt."})
+
+    return Handler
+
+
+def serve(port=8600, root=SNAPSHOT_DIR):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(SnapshotStore(root)))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokale Lese-API für Risiko-Snapshots.")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--root", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+    serve(args.port, args.root)
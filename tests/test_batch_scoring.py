@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pytest
+
+import batch_scoring
+import replay
+import scheduler
+from indicators import BATCH_SIZE, OPEN_METEO_URL
+from sites import load_registry
+from test_indicators import _weather_payload
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake-Open-Meteo (eine Antwort je Koordinate) und fester Live-NDVI."""
+    calls = []
+
+    def send(url, params=None, timeout=None, **kwargs):
+        assert url == OPEN_METEO_URL
+        n = len(params["latitude"].split(","))
+        calls.append(n)
+        body = [_weather_payload(i) for i in range(n)]
+        return replay._response(url, 200, {}, json.dumps(body if n > 1 else body[0]).encode())
+
+    monkeypatch.setattr(scheduler, "_default", scheduler.RequestScheduler(send=send))
+    monkeypatch.setattr(batch_scoring, "open_default_cube", lambda: None)
+    monkeypatch.setattr(batch_scoring, "get_site_ndvi", lambda site_id, lat, lon, cube, priority: ("2026-10-01", 0.5))
+    return calls
+
+
+def test_score_all_batches_weather_and_scores_in_workers(upstream):
+    registry = load_registry()
+    scores = batch_scoring.score_all(workers=2, chunk_size=3)
+
+    assert upstream == [3, len(registry) - 3]  # eine Sammelanfrage je Block statt zwei je Standort
+    assert list(scores["site_id"]) == list(registry.ids)
+    assert scores.attrs["failed"] == 0
+    assert (scores["ndvi"] == 0.5).all()
+
+    # Gleiches Ergebnis wie die Blockbewertung im Hauptprozess
+    cfg = {key: col[:3].astype(np.float64) for key, col in registry.configs().items()}
+    body = json.dumps([_weather_payload(i) for i in range(3)]).encode()
+    expected = batch_scoring.score_block(body, np.full(3, 0.5), cfg)
+    np.testing.assert_allclose(scores[list(batch_scoring.COLUMNS)].to_numpy()[:3], expected)
+
+
+def test_failed_weather_block_leaves_sites_empty(upstream, monkeypatch):
+    def fetch_batch_raw(lats, lons, params):
+        raise OSError("Upstream nicht erreichbar")
+
+    monkeypatch.setattr(batch_scoring, "fetch_batch_raw", fetch_batch_raw)
+    scores = batch_scoring.score_all(workers=1, chunk_size=BATCH_SIZE)
+    assert scores.attrs["failed"] == len(scores)
+    assert scores[list(batch_scoring.COLUMNS)].isna().all().all()
@@ -0,0 +1,41 @@
+import time
+
+import numpy as np
+
+from cache_manager import MISSING, CacheManager
+
+
+def _spill_files(path):
+    return list(path.glob("*/*.pkl"))
+
+
+def test_evicted_entries_spill_and_come_back(tmp_path):
+    cache = CacheManager(max_bytes=1000, spill_dir=tmp_path)
+    cache.put("a", np.zeros(100))  # 800 B
+    cache.put("b", np.ones(100))   # verdrängt "a" → Spill
+    assert len(_spill_files(tmp_path)) == 1
+
+    np.testing.assert_array_equal(cache.get("a"), np.zeros(100))
+    assert cache.metrics()["spill_hits"] == 1
+
+
+def test_spill_directory_is_capped(tmp_path):
+    cache = CacheManager(max_bytes=1000, spill_dir=tmp_path, spill_max_bytes=5000)
+    for i in range(20):
+        cache.put(i, np.full(100, i, dtype=np.float64))
+
+    m = cache.metrics()
+    on_disk = sum(p.stat().st_size for p in _spill_files(tmp_path))
+    assert m["spills"] == 19
+    assert m["spill_removed"] > 0
+    assert on_disk == m["spill_bytes"] <= 5000
+    # Die jüngsten Auslagerungen bleiben erhalten, die ältesten sind weg
+    assert cache.get(18) is not MISSING
+    assert cache.get(0) is MISSING
+
+
+def test_expired_entries_are_not_spilled(tmp_path):
+    cache = CacheManager(max_bytes=1000, spill_dir=tmp_path)
+    cache.put("old", np.zeros(100), ttl=60, created=time.time() - 120)
+    cache.put("new", np.ones(100))
+    assert _spill_files(tmp_path) == []
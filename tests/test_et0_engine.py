@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import et0_engine
+
+# FAO-56, Beispiel 19: N'Diaye (Senegal), 1. Oktober, 16°13'N, 16°15'W, 8 m ü. NN.
+# Die Stunden 02–03 und 14–15 Uhr Ortszeit (Lz = 15°W) enden um 04 bzw. 16 Uhr UTC.
+LAT = [16 + 13 / 60]
+LON = [-(16 + 15 / 60)]
+ELEVATION = 8.0
+TIMES = np.array(["2026-10-01T04:00", "2026-10-01T16:00"], dtype="datetime64[m]")
+
+
+def test_fao56_example19_intermediate_values():
+    assert et0_engine.saturation_vapour_pressure(38.0) == pytest.approx(6.625, abs=1e-3)
+    assert et0_engine.psychrometric_constant(ELEVATION) == pytest.approx(0.0673, abs=1e-4)
+    ra = et0_engine.extraterrestrial_radiation_hourly(TIMES, LAT, LON)
+    assert ra[0, 0] == 0.0
+    assert ra[0, 1] == pytest.approx(3.543, abs=1e-3)
+
+
+def test_fao56_example19_hourly_et0():
+    et0 = et0_engine.et0_hourly(
+        temp_c=[[28.0, 38.0]],
+        rh_pct=[[90.0, 52.0]],
+        wind_ms=[[1.9, 3.3]],  # bereits in 2 m Höhe gemessen
+        rad_wm2=[[0.0, 2.450 / 0.0036]],  # Rs = 2,450 MJ m⁻² h⁻¹
+        time_utc=TIMES, lat=LAT, lon=LON, elevation=ELEVATION, wind_height=2.0,
+    )
+    night, day = et0[0]
+    assert day == pytest.approx(0.63, abs=0.005)
+    assert night == pytest.approx(0.0, abs=0.01)
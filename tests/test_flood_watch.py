@@ -0,0 +1,63 @@
+import numpy as np
+
+from flood_watch import KIND_DAILY, KIND_FLASH, FloodWatcher
+from risk_model import FLOOD_LABELS, NO_DATA
+from sites import load_registry
+
+LOW, MEDIUM, HIGH = FLOOD_LABELS
+START = np.datetime64("2026-10-19T00", "h").astype(np.int64)
+
+
+def _feed(watcher, values, first_hour, now_hour=None):
+    """Eine Stundenreihe (für Standort 0) ab `first_hour` einspielen."""
+    values = np.asarray(values, dtype=np.float32)[None, :]
+    hours = first_hour + np.arange(values.shape[1], dtype=np.int64)
+    now_hour = hours[-1] if now_hour is None else now_hour
+    return watcher.update(np.array([0]), hours, values, now_hour)
+
+
+def _changes(events):
+    return {(e.kind, e.previous, e.current) for e in events}
+
+
+def _watcher():
+    return FloodWatcher(registry=load_registry(), fetch=None)
+
+
+def test_quiet_start_reports_nothing_and_threshold_crossings_do():
+    watcher = _watcher()
+    assert _feed(watcher, np.zeros(24), START) == []
+
+    events = _feed(watcher, [25.0], START + 24)
+    assert _changes(events) == {(KIND_FLASH, LOW, HIGH), (KIND_DAILY, LOW, MEDIUM)}
+    assert {e.site_id for e in events} == {watcher.registry.ids[0]}
+    assert next(e for e in events if e.kind == KIND_FLASH).value_mm == 25.0
+
+    # Unverändert hoch → keine Meldung; nach drei trockenen Stunden wieder gering
+    assert _feed(watcher, [0.0, 0.0], START + 25) == []
+    assert _changes(_feed(watcher, [0.0], START + 27)) == {(KIND_FLASH, HIGH, LOW)}
+
+
+def test_elevated_level_on_first_run_is_reported():
+    watcher = _watcher()
+    events = _feed(watcher, [0.0] * 21 + [10.0, 10.0, 10.0], START)
+    assert _changes(events) == {(KIND_FLASH, NO_DATA, HIGH), (KIND_DAILY, NO_DATA, MEDIUM)}
+
+
+def test_nan_hours_keep_last_level():
+    watcher = _watcher()
+    _feed(watcher, [0.0] * 23 + [25.0], START)
+
+    # Fehlende Stunden machen die Summen unbestimmt – kein Wechsel nach "Keine Daten"
+    assert _feed(watcher, [np.nan, np.nan], START + 24) == []
+    assert watcher.flash_level[0] == 2 and watcher.daily_level[0] == 1
+
+    # Sobald das 3h-Fenster wieder vollständig ist, zählt der echte Wert
+    assert _changes(_feed(watcher, [0.0, 0.0, 0.0], START + 26)) == {(KIND_FLASH, HIGH, LOW)}
+
+
+def test_unfinished_hours_are_ignored():
+    watcher = _watcher()
+    events = _feed(watcher, [0.0] * 24 + [40.0], START, now_hour=START + 23)
+    assert events == []
+    assert watcher.last_hour[0] == START + 23
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import indicators
+from ndvi_cube import NDVICube, modis_dates
+
+
+def _cube(path, last_day):
+    dates = modis_dates(last_day - timedelta(days=40), last_day)
+    cube = NDVICube.create(path, ["DE-DA"], dates, n_pixels=4)
+    cube.write("DE-DA", dates[-1]["modis_date"], [0.6, 0.6, 0.6, 0.6])
+    cube.publish()
+    return NDVICube.open(path), dates[-1]["calendar_date"]
+
+
+@pytest.fixture
+def live(monkeypatch):
+    calls = []
+
+    def get_latest_ndvi(lat, lon, priority):
+        calls.append((lat, lon))
+        return "2026-10-01", 0.4
+
+    monkeypatch.setattr(indicators, "get_latest_ndvi", get_latest_ndvi)
+    return calls
+
+
+def test_site_ndvi_prefers_fresh_cube(tmp_path, live):
+    cube, day = _cube(tmp_path, date.today())
+    calendar_date, ndvi = indicators.get_site_ndvi("DE-DA", 49.9, 8.7, cube)
+    assert calendar_date == day
+    assert ndvi == pytest.approx(0.6)
+    assert live == []
+
+
+def test_site_ndvi_falls_back_to_live(tmp_path, live):
+    cube, _ = _cube(tmp_path, date.today() - timedelta(days=80))
+    assert indicators.get_site_ndvi("DE-DA", 49.9, 8.7, cube) == ("2026-10-01", 0.4)
+    assert indicators.get_site_ndvi("XX-UNBEKANNT", 1.0, 2.0, cube) == ("2026-10-01", 0.4)
+    assert indicators.get_site_ndvi("DE-DA", 49.9, 8.7, None) == ("2026-10-01", 0.4)
+    assert len(live) == 3
+
+
+def test_cube_series_only_when_fresh(tmp_path):
+    cube, day = _cube(tmp_path / "fresh", date.today())
+    df = indicators.get_cube_ndvi_series("DE-DA", cube)
+    assert df["date"].iloc[-1].date().isoformat() == day
+
+    stale, _ = _cube(tmp_path / "stale", date.today() - timedelta(days=80))
+    assert indicators.get_cube_ndvi_series("DE-DA", stale) is None
+    assert indicators.get_cube_ndvi_series("DE-DA", None) is None
+
+
+def _weather_payload(seed):
+    rng = np.random.default_rng(seed)
+    hours = np.arange("2026-10-16T00", "2026-10-19T00", dtype="datetime64[h]")
+    rain = rng.gamma(0.3, 2.0, len(hours)).round(1).tolist()
+    rain[-1] = None  # letzte Stunde noch nicht geliefert
+    return {
+        "hourly": {
+            "time": [str(h) + ":00" for h in hours],
+            "precipitation": rain,
+            "et0_fao_evapotranspiration": rng.uniform(0, 0.4, len(hours)).round(2).tolist(),
+        },
+        "daily": {
+            "time": ["2026-10-16", "2026-10-17", "2026-10-18"],
+            "precipitation_sum": [float(np.nansum(np.array(rain[d * 24:(d + 1) * 24], dtype=float))) for d in range(3)],
+        },
+    }
+
+
+def test_batch_weather_matches_single_site_indicators(monkeypatch):
+    payloads = [_weather_payload(seed) for seed in range(3)]
+    drought, p1h, p3h, p24h = indicators.batch_weather(payloads)
+
+    for i, payload in enumerate(payloads):
+        monkeypatch.setattr(indicators.payload_cache, "get_json", lambda *a, **k: payload)
+        assert drought[i] == pytest.approx(indicators.get_drought(0.0, 0.0))
+        assert (p1h[i], p3h[i], p24h[i]) == pytest.approx(indicators.get_flood(0.0, 0.0))
@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import fake_modis_server
+import modis_bulk
+from fake_modis_server import fake_subset_lines
+from ndvi_cube import NDVICube, is_fresh, modis_dates, open_cube
+from sites import load_registry
+
+
+@pytest.fixture
+def fake_server():
+    server, base = fake_modis_server.start_in_thread(delay=0.0)
+    yield base
+    server.shutdown()
+    server.server_close()
+
+
+def test_ingest_fills_cube_from_fake_server(fake_server, tmp_path):
+    site_ids = list(load_registry().ids)[:2]
+    client = modis_bulk.ModisOrderClient(f"{fake_server}/rst/api/v1", f"{fake_server}/subsetdata")
+
+    result = modis_bulk.ingest(
+        date(2026, 6, 1), date(2026, 7, 31), km=1, site_ids=site_ids,
+        path=tmp_path, client=client, poll_interval=0.01, timeout=10,
+    )
+
+    cube = NDVICube.open(tmp_path)
+    assert set(result) == set(site_ids)
+    for site_id in site_ids:
+        assert result[site_id] == len(cube.dates)
+        series = cube.series(site_id)
+        assert [d.date().isoformat() for d in series["date"]] == [d["calendar_date"] for d in cube.dates]
+
+        # Erwartung: Pixelmittel der Fake-Zeilen, skaliert wie in modis_bulk
+        lat, lon = load_registry().coords(site_id)
+        lines = fake_subset_lines(lat, lon, cube.dates[0]["modis_date"], cube.dates[-1]["modis_date"], 1)
+        expected = [np.mean([int(v) for v in line.split(",")[6:]]) * modis_bulk.NDVI_SCALE for line in lines]
+        np.testing.assert_allclose(series["ndvi"], expected, rtol=1e-5)
+
+
+def test_is_fresh_allows_two_composite_periods():
+    today = date(2026, 10, 19)
+    assert is_fresh((today - timedelta(days=32)).isoformat(), today)
+    assert not is_fresh((today - timedelta(days=33)).isoformat(), today)
+
+
+def test_rebuild_swaps_meta_and_keeps_open_readers_intact(tmp_path):
+    dates = modis_dates(date(2026, 6, 1), date(2026, 6, 30))
+    first = NDVICube.create(tmp_path, ["DE-DA"], dates, n_pixels=2)
+    first.write("DE-DA", dates[0]["modis_date"], [0.2, 0.2])
+    first.publish()
+    reader = open_cube(tmp_path)
+    assert reader.build == first.build and reader.is_current()
+
+    second = NDVICube.create(tmp_path, ["DE-DA"], dates, n_pixels=2)
+    second.write("DE-DA", dates[0]["modis_date"], [0.7, 0.7])
+    assert open_cube(tmp_path) is reader  # unveröffentlicht: Leser sehen noch den alten Lauf
+    second.publish()
+
+    assert not reader.is_current()
+    np.testing.assert_allclose(reader.pixels("DE-DA")[0], [0.2, 0.2])
+    fresh = open_cube(tmp_path)
+    assert fresh.build == second.build
+    np.testing.assert_allclose(fresh.pixels("DE-DA")[0], [0.7, 0.7])
+
+    third = NDVICube.create(tmp_path, ["DE-DA"], dates, n_pixels=2)
+    third.publish()
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == [second.build, third.build]
@@ -0,0 +1,64 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import cache_manager
+import payload_cache
+import replay
+import scheduler
+from payload_cache import decode_payload, encode_payload
+
+
+def test_uniform_time_axis_roundtrip():
+    times = [f"2026-10-0{d}T00:00" for d in range(1, 7)]
+    out = decode_payload(encode_payload({"hourly": {"time": times, "v": [1.0, 2.0, None, 4.0, 5.0, 6.0]}}))
+    np.testing.assert_array_equal(out["hourly"]["time"], np.array(times, dtype="datetime64[m]"))
+    assert np.isnan(out["hourly"]["v"][2])
+
+
+def test_mixed_time_resolution_stays_in_header():
+    mixed = ["2026-10-01", "2026-10-02T06:30", "2026-10-03", "2026-10-04"]
+    assert decode_payload(encode_payload({"time": mixed}))["time"] == mixed
+
+    irregular = ["2026-10-01", "2026-10-02", "2026-10-05", "2026-10-06"]
+    out = decode_payload(encode_payload({"time": irregular}))["time"]
+    np.testing.assert_array_equal(out, np.array(irregular, dtype="datetime64[D]"))
+
+
+def test_cache_and_fixtures_share_request_key(tmp_path):
+    url, params = "https://api.open-meteo.com/v1/forecast", {"longitude": 8.65, "latitude": 49.87}
+    key = replay.request_key(url, params)
+    assert key == replay.request_key(url, dict(reversed(list(params.items()))))
+    assert replay.fixture_path(tmp_path, url, params).stem == key
+    assert payload_cache._cache_file(key).stem == key
+
+
+def test_only_time_fields_become_time_axes():
+    data = {"ids": ["1", "2", "3", "4"], "labels": ["2026", "2027", "2028", "2029"], "time": ["2026", "2027", "2028", "2029"]}
+    out = decode_payload(encode_payload(data))
+    assert out["ids"] == data["ids"] and out["labels"] == data["labels"]
+    np.testing.assert_array_equal(out["time"], np.array(data["time"], dtype="datetime64[Y]"))
+
+
+def test_concurrent_misses_share_one_upstream_call(tmp_path, monkeypatch):
+    url, params = "https://api.open-meteo.com/v1/forecast", {"latitude": 1.5, "longitude": 2.5}
+    calls = []
+
+    def send(url, params=None, timeout=None, **kwargs):
+        calls.append(url)
+        time.sleep(0.1)  # weitere Aufrufer laufen in der Zwischenzeit auf
+        return replay._response(url, 200, {}, json.dumps({"hourly": {"v": [1, 2, 3, 4]}}).encode())
+
+    monkeypatch.setattr(payload_cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(scheduler, "_default", scheduler.RequestScheduler(send=send))
+    monkeypatch.setattr(cache_manager, "_default", cache_manager.CacheManager(spill_dir=None))
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: payload_cache.get_json(url, params), range(8)))
+
+    assert len(calls) == 1
+    for out in results:
+        np.testing.assert_array_equal(out["hourly"]["v"], [1, 2, 3, 4])
+    assert payload_cache._flights == {}
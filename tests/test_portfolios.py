@@ -0,0 +1,35 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import portfolios
+from risk_model import COLUMNS
+from snapshots import SnapshotStore, write_snapshot
+
+
+def _write(path, weights, mtime):
+    path.write_text(json.dumps({"p": {"label": "P", "weights": weights}}), encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_profiles_reload_when_file_changes(tmp_path):
+    path = tmp_path / "portfolios.json"
+    _write(path, {"veg_risk": 1, "drought_risk": 1, "flood_risk": 2}, 1_000_000_000)
+    assert portfolios.load_profiles(path)["p"].weights == (0.25, 0.25, 0.5)
+    assert portfolios.load_profiles(path) is portfolios.load_profiles(path)
+
+    _write(path, {"veg_risk": 1, "drought_risk": 0, "flood_risk": 0}, 2_000_000_000)
+    assert portfolios.load_profiles(path)["p"].weights == (1.0, 0.0, 0.0)
+
+
+def test_apply_profile_records_portfolio(tmp_path):
+    scores = pd.DataFrame([dict({c: 0.5 for c in COLUMNS}, site_id="A", total_score=50)])
+    write_snapshot(scores, "2026-10-01T00:00Z", root=tmp_path, portfolio="agrar")
+    components = SnapshotStore(tmp_path).scores_at()
+    assert list(components["portfolio"]) == ["agrar"]
+
+    out = portfolios.apply_profile(components.assign(flood_risk=1.0), portfolios.get_profile("infrastruktur"))
+    assert list(out["portfolio"]) == ["infrastruktur"]
+    assert out["total_risk"].iloc[0] == pytest.approx(0.5 * 0.1 + 0.5 * 0.2 + 1.0 * 0.7)
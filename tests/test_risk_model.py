@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from risk_model import (
+    DAILY_FLOOD_THRESHOLDS,
+    FLASH_FLOOD_THRESHOLDS,
+    NO_DATA,
+    bin_codes,
+    classify_daily_flood,
+    classify_daily_flood_series,
+    classify_drought_series,
+    classify_flash_flood,
+    classify_flash_flood_series,
+    drought_edges,
+    flood_edges,
+    flood_label,
+    flood_levels,
+    risk_label,
+    risk_labels,
+)
+from sites import load_registry
+
+
+def drought_reference(x):
+    """Bisherige Zeilen-Klassifikation aus `et0_app.py` (vor der Vektorisierung)."""
+    if x < 0:
+        return "🟢 Nass"
+    elif x < 1.5:
+        return "🟢 Normal"
+    elif x < 3:
+        return "🟠 Moderat"
+    else:
+        return "🔴 Stark"
+
+
+def _values(edges, low, high, n=20_000):
+    """Schwellen, Nachbarwerte direkt daneben, Zufallswerte und NaN."""
+    edges = np.asarray(edges, dtype=np.float64)
+    near = np.concatenate([edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf)])
+    rng = np.random.default_rng(0)
+    return np.concatenate([near, rng.uniform(low, high, n), [low, high, -np.inf, np.inf, np.nan]])
+
+
+@pytest.mark.parametrize(
+    "scalar, vectorized, values",
+    [
+        (risk_label, risk_labels, _values((20, 40, 65, 85), -10, 110)),
+        (drought_reference, classify_drought_series, _values((0, 1.5, 3), -5, 10)),
+        (classify_flash_flood, classify_flash_flood_series, _values(FLASH_FLOOD_THRESHOLDS, 0, 40)),
+        (classify_daily_flood, classify_daily_flood_series, _values(DAILY_FLOOD_THRESHOLDS, 0, 100)),
+    ],
+)
+def test_vectorized_labels_match_scalar(scalar, vectorized, values):
+    assert list(vectorized(values)) == [scalar(v) for v in values]
+
+
+def test_risk_labels_na_label():
+    assert list(risk_labels([np.nan, 10], na_label=NO_DATA)) == [NO_DATA, "🟢 Niedrig"]
+
+
+@pytest.mark.parametrize(
+    "thresholds, scalar",
+    [(FLASH_FLOOD_THRESHOLDS, classify_flash_flood), (DAILY_FLOOD_THRESHOLDS, classify_daily_flood)],
+)
+def test_flood_levels_match_scalar(thresholds, scalar):
+    values = _values(thresholds, 0, 100, n=2_000)
+    assert [flood_label(level) for level in flood_levels(values, thresholds)] == [scalar(v) for v in values]
+
+
+def test_zone_edges_per_row_match_per_zone_classification():
+    registry = load_registry()
+    cfg = registry.configs()
+    rng = np.random.default_rng(1)
+    drought = rng.uniform(-2, 8, len(registry))
+    p3h = rng.uniform(0, 40, len(registry))
+
+    per_row = classify_drought_series(drought, drought_edges(cfg))
+    levels = flood_levels(p3h, flood_edges(cfg, "p3h"))
+    for i, site_id in enumerate(registry.ids):
+        site = registry.config(site_id)
+        assert per_row[i] == classify_drought_series([drought[i]], drought_edges(site))[0]
+        assert list(drought_edges(site)) == [0.0, site["drought_low"], site["drought_high"]]
+        assert levels[i] == flood_levels([p3h[i]], flood_edges(site, "p3h"))[0]
+
+
+def test_matrix_edges_match_digitize():
+    values = _values((1.0, 2.0), -1, 4, n=500)
+    edges = np.tile([1.0, 2.0], (len(values), 1))
+    np.testing.assert_array_equal(bin_codes(values, edges), bin_codes(values, (1.0, 2.0)))
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+import risk_tiles
+from portfolios import load_profiles
+from risk_tiles import (
+    TOTAL, TilePyramid, compute_grid, grid_for_bbox, query_grid, renormalized_total, resample, total_layer,
+    tiles_for_bbox,
+)
+from sites import load_registry
+
+
+def _fetch(lats, lons):
+    n = len(lats)
+    return np.full(n, 2.0), np.full(n, 5.0), np.full(n, 20.0)
+
+
+def test_renormalized_total_skips_missing_components():
+    risks = np.array([[np.nan, 0.5, 1.0], [0.2, 0.4, 0.6], [np.nan] * 3])
+    total = renormalized_total(risks, (0.5, 0.25, 0.25))
+    assert total[0] == pytest.approx(0.75)
+    assert total[1] == pytest.approx(0.1 + 0.1 + 0.15)
+    assert np.isnan(total[2])
+
+
+def test_compute_grid_queries_weather_grid_not_pixels():
+    calls = []
+
+    def fetch(lats, lons):
+        calls.append(len(lats))
+        return _fetch(lats, lons)
+
+    bbox = (49, 8, 50, 9)
+    _, layers, failed = compute_grid(bbox, 6, fetch=fetch)
+    _, lats, lons = grid_for_bbox(bbox, 6)
+    _, q_lats, q_lons = query_grid(bbox, 6)
+    assert sum(calls) == q_lats.size * q_lons.size == 11 * 11
+    assert sum(calls) < lats.size * lons.size
+    assert failed == 0
+    assert layers["drought_risk"].shape == (lats.size, lons.size)
+    assert not np.isnan(layers["drought_risk"]).any()
+
+
+def test_resample_is_exact_for_linear_fields_and_falls_back_to_nearest():
+    bbox = (49, 8, 50, 9)
+    step, q_lats, q_lons = query_grid(bbox, 6)
+    _, lats, lons = grid_for_bbox(bbox, 6)
+    values = 3.0 * q_lats[:, None] - 2.0 * q_lons[None, :] + 1.0
+    out = resample(values, bbox, step, lats, lons)
+    rows, cols = (lats >= 49) & (lats <= 50), (lons >= 8) & (lons <= 9)
+    np.testing.assert_allclose(out[rows][:, cols], 3.0 * lats[rows, None] - 2.0 * lons[None, cols] + 1.0)
+
+    # Fehlender Gitterpunkt → Nachbarpixel nehmen den nächsten vorhandenen Wert
+    values = np.ones((q_lats.size, q_lons.size))
+    values[0, 0] = np.nan
+    out = resample(values, bbox, step, lats, lons)
+    assert not np.isnan(out[lats < 49.9]).any()
+
+
+def test_nearest_indices_match_nearest_index():
+    registry = load_registry()
+    lats = np.array([49.5, -9.5, 0.0, 60.0])
+    lons = np.array([8.5, 100.5, 0.0, -120.0])
+    expected = [registry.nearest_index(la, lo) for la, lo in zip(lats, lons)]
+    assert list(registry.nearest_indices(lats, lons, chunk=3)) == expected
+
+
+def test_build_writes_total_per_profile_and_drops_old_builds(tmp_path, monkeypatch):
+    monkeypatch.setattr(risk_tiles, "compute_grid", lambda bbox, z, profiles, with_ndvi: compute_grid(bbox, z, profiles, with_ndvi, fetch=_fetch))
+
+    risk_tiles.build((49, 8, 50, 9), 1, root=tmp_path)
+    pyramid = TilePyramid(tmp_path)
+    first = pyramid.meta
+    assert first["layers"] == ["drought_risk", "flood_risk", TOTAL]
+    assert first["profiles"] == list(load_profiles())
+    assert not first["ndvi"]
+    for name in first["profiles"]:
+        assert pyramid.tiles_in_view(total_layer(name), (49, 8, 50, 9), 1)
+
+    risk_tiles.build((-10, 100, -9, 101), 1, ["agrar"], root=tmp_path)
+    second = pyramid.meta
+    assert second["build"] != first["build"]
+    # Der abgelöste Lauf bleibt für Leser mit altem meta.json noch erreichbar
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == sorted([first["build"], second["build"]])
+    assert list(second["retired"]) == [first["build"]]
+    # Kacheln des alten Ausschnitts werden nicht mehr ausgeliefert
+    old_tiles = tiles_for_bbox((49, 8, 50, 9), 1)
+    assert not any(pyramid.tile_path(second["build"], total_layer("agrar"), 1, x, y).exists() for x, y in old_tiles)
+    assert pyramid.tiles_in_view(total_layer("standard"), (49, 8, 50, 9), 1) == []
+
+    # Nach Ablauf der Frist wird er gelöscht; der gerade abgelöste bleibt
+    monkeypatch.setattr(risk_tiles, "BUILD_GRACE_S", 0)
+    risk_tiles.build((-10, 100, -9, 101), 1, ["agrar"], root=tmp_path)
+    third = pyramid.meta
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == sorted([second["build"], third["build"]])
@@ -0,0 +1,143 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import scheduler
+from scheduler import BATCH, INTERACTIVE, RequestScheduler, parse_retry_after
+
+HOST = "api.example.org"
+URL = f"https://{HOST}/data"
+
+
+class FakeClock:
+    """Fake-Uhr: Wartezeiten mit Timeout werden sofort vorgespult, solange `running` gesetzt ist."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.running = threading.Event()
+        self.running.set()
+
+    def __call__(self):
+        return self.now
+
+    def wait(self, cond, timeout):
+        if timeout is None or not self.running.is_set():
+            cond.wait(0.01)  # andere Threads einreihen lassen
+            return
+        self.now += timeout
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSend:
+    def __init__(self, clock, responses=()):
+        self.clock = clock
+        self.responses = list(responses)
+        self.calls = []  # (Zeitpunkt, Parameter)
+        self.sent = []
+
+    def __call__(self, url, params=None, timeout=None, **kwargs):
+        self.calls.append((self.clock(), params))
+        res = self.responses.pop(0) if self.responses else FakeResponse(200)
+        self.sent.append(res)
+        return res
+
+
+def _scheduler(clock, send, rate=1.0, burst=2, **kwargs):
+    return RequestScheduler(limits={HOST: (rate, burst)}, send=send, clock=clock, wait=clock.wait, **kwargs)
+
+
+def test_token_bucket_burst_then_rate():
+    clock = FakeClock()
+    send = FakeSend(clock)
+    sched = _scheduler(clock, send, rate=2.0, burst=3)
+
+    for _ in range(5):
+        sched.get(URL)
+
+    times = [t for t, _ in send.calls]
+    assert times[:3] == [0.0, 0.0, 0.0]
+    assert times[3] == 0.5 and times[4] == 1.0
+    m = sched.metrics()[HOST]
+    assert m["requests"] == 5 and m["queue_depth"] == 0
+    assert m["wait_max_s"] == 0.5
+
+
+def test_interactive_requests_jump_the_batch_queue():
+    clock = FakeClock()
+    send = FakeSend(clock)
+    sched = _scheduler(clock, send, rate=1.0, burst=1)
+    sched.get(URL, params={"n": "warmup"})  # Bucket leeren
+    clock.running.clear()
+
+    threads = []
+    for name, prio in [("b1", BATCH), ("b2", BATCH), ("i1", INTERACTIVE)]:
+        t = threading.Thread(target=sched.get, args=(URL,), kwargs={"params": {"n": name}, "priority": prio})
+        t.start()
+        threads.append(t)
+        deadline = time.monotonic() + 2
+        while sched.metrics()[HOST]["queue_depth"] < len(threads) and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    assert sched.metrics()[HOST]["queue_interactive"] == 1
+    clock.running.set()
+    for t in threads:
+        t.join(2)
+
+    assert [p["n"] for _, p in send.calls] == ["warmup", "i1", "b1", "b2"]
+
+
+def test_retry_after_blocks_host_and_closes_discarded_response():
+    clock = FakeClock()
+    limited = FakeResponse(429, {"Retry-After": "7"})
+    send = FakeSend(clock, [limited])
+    sched = _scheduler(clock, send, rate=10.0, burst=10)
+
+    res = sched.get(URL)
+
+    assert res.status_code == 200 and not res.closed
+    assert limited.closed
+    assert [t for t, _ in send.calls] == [0.0, 7.0]
+    assert sched.metrics()[HOST]["throttled"] == 1
+
+
+def test_503_without_header_backs_off_exponentially():
+    clock = FakeClock()
+    send = FakeSend(clock, [FakeResponse(503), FakeResponse(503), FakeResponse(200)])
+    sched = _scheduler(clock, send, rate=10.0, burst=10)
+
+    assert sched.get(URL).status_code == 200
+    assert [t for t, _ in send.calls] == [0.0, 1.0, 3.0]
+    assert all(r.closed for r in send.sent[:2])
+
+
+def test_last_attempt_and_long_retry_after_are_returned_open():
+    clock = FakeClock()
+    send = FakeSend(clock, [FakeResponse(429, {"Retry-After": "1"}) for _ in range(3)])
+    sched = _scheduler(clock, send, rate=10.0, burst=10, max_retries=2)
+    res = sched.get(URL)
+    assert res.status_code == 429 and not res.closed
+    assert len(send.calls) == 3
+
+    too_long = FakeResponse(429, {"Retry-After": str(int(scheduler.MAX_RETRY_AFTER) + 1)})
+    send = FakeSend(clock, [too_long])
+    res = _scheduler(clock, send).get(URL)
+    assert res is too_long and not res.closed
+    assert len(send.calls) == 1
+
+
+def test_parse_retry_after():
+    now = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("30") == 30.0
+    assert parse_retry_after("Mon, 19 Oct 2026 12:00:45 GMT", now=now) == 45.0
+    assert parse_retry_after("Mon, 19 Oct 2026 11:00:00 GMT", now=now) == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("bald") is None
@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import snapshots
+from portfolios import DEFAULT_PROFILE
+from risk_model import COLUMNS
+from snapshots import SnapshotStore, write_snapshot
+
+
+def _scores(site_ids, total):
+    df = pd.DataFrame({"site_id": site_ids})
+    for col in COLUMNS:
+        df[col] = total
+    df["total_score"] = round(total * 100)
+    return df
+
+
+def test_history_latest_and_scores_at(tmp_path):
+    write_snapshot(_scores(["A", "B"], 0.2), "2026-10-01T00:00Z", root=tmp_path)
+    write_snapshot(_scores(["A"], 0.4), "2026-10-02T00:00Z", root=tmp_path)
+    store = SnapshotStore(tmp_path)
+
+    assert list(store.history("A")["total_risk"]) == [0.2, 0.4]
+    assert list(store.history("A", start="2026-10-01T12:00Z")["total_risk"]) == [0.4]
+    assert store.latest("B")["total_score"] == 20
+    assert store.latest("C") is None
+    at = store.scores_at("2026-10-01T12:00Z").set_index("site_id")["total_risk"]
+    assert at.to_dict() == {"A": 0.2, "B": 0.2}
+
+
+def test_history_consistent_during_refresh(tmp_path):
+    write_snapshot(_scores(["A", "B"], 0.1), "2026-10-01T00:00Z", root=tmp_path)
+    store = SnapshotStore(tmp_path)
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            rows = store.history("B")
+            if not (rows["site_id"] == "B").all() or rows.empty:
+                errors.append(rows)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for day in range(2, 12):
+        ids = ["A"] * day + ["B"]  # verschiebt den Zeilenbereich von B
+        write_snapshot(_scores(ids, 0.1 * day), f"2026-10-{day:02d}T00:00Z", root=tmp_path)
+        store.refresh()
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(store.history("B")) == 11
+    assert np.isclose(store.latest("B")["total_risk"], 1.1)
+
+
+def test_scores_at_matches_filter_and_groupby(tmp_path):
+    rng = np.random.default_rng(3)
+    times = pd.date_range("2026-10-01", periods=8, freq="6h", tz="UTC")
+    for i, t in enumerate(times):
+        ids = sorted(rng.choice(list("ABCDEFG"), size=rng.integers(1, 6), replace=False))
+        write_snapshot(_scores(ids, i / 10), t, root=tmp_path)
+    store = SnapshotStore(tmp_path)
+    assert store.scores_at("2026-09-30T00:00Z").empty
+
+    for at in [None, times[0], times[3] + pd.Timedelta("1h"), times[-1]]:
+        df = store.df if at is None else store.df[store.df["computed_at"] <= at]
+        expected = df.groupby("site_id", sort=False).tail(1)
+        pd.testing.assert_frame_equal(store.scores_at(at), expected)
+
+
+def test_refresh_reads_only_new_files(tmp_path, monkeypatch):
+    write_snapshot(_scores(["A"], 0.1), "2026-10-01T00:00Z", root=tmp_path)
+    store = SnapshotStore(tmp_path)
+    read = []
+    original = snapshots._read_snapshot
+    monkeypatch.setattr(snapshots, "_read_snapshot", lambda path: read.append(path) or original(path))
+
+    new = write_snapshot(_scores(["A", "B"], 0.2), "2026-10-02T00:00Z", root=tmp_path)
+    store.refresh()
+    assert read == [new]
+    assert list(store.history("A")["total_risk"]) == [0.1, 0.2]
+
+
+def test_v1_snapshots_get_default_portfolio(tmp_path):
+    v1 = tmp_path / "v1"
+    v1.mkdir()
+    old = _scores(["A"], 0.3)
+    old.insert(1, "computed_at", pd.Timestamp("2026-09-01T00:00Z"))
+    old.to_parquet(v1 / "scores-20260901T000000000000Z.parquet", index=False)
+    write_snapshot(_scores(["A"], 0.5), "2026-10-01T00:00Z", root=tmp_path, portfolio="infrastruktur")
+
+    history = SnapshotStore(tmp_path).history("A")
+    assert list(history.columns) == list(snapshots.SNAPSHOT_COLUMNS)
+    assert list(history["portfolio"]) == [DEFAULT_PROFILE, "infrastruktur"]
+    assert list(history["total_risk"]) == [0.3, 0.5]
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+import replay
+import scheduler
+from water_balance import MAX_PAST_DAYS, SPINUP_DAYS, WaterBalanceState, fetch_daily, past_days_needed
+
+
+def _days(start, n):
+    return np.datetime64(start, "D") + np.arange(n)
+
+
+def test_update_skips_known_days():
+    state = WaterBalanceState()
+    dates = np.tile(_days("2026-10-01", 3), (2, 1))
+    assert state.update([0, 1], dates, np.full((2, 3), 2.0), np.zeros((2, 3))) == 6
+    assert state.update([0, 1], dates, np.full((2, 3), 2.0), np.zeros((2, 3))) == 0
+    assert str(state.last_date[0]) == "2026-10-03"
+
+
+def test_update_resets_site_after_gap():
+    state = WaterBalanceState()
+    state.storage[[0, 1]] = 0.0
+    state.last_date[0] = np.datetime64("2026-09-30")  # lückenlos
+    state.last_date[1] = np.datetime64("2026-08-01")  # Lücke bis 01.10.
+    dates = np.tile(_days("2026-10-01", 2), (2, 1))
+
+    state.update([0, 1], dates, np.zeros((2, 2)), np.zeros((2, 2)))
+
+    assert state.storage[0] == 0.0
+    assert state.storage[1] == state.capacity[1]  # Neustart mit vollem Speicher
+    assert str(state.last_date[1]) == "2026-10-02"
+
+
+def test_past_days_widen_for_old_state():
+    today = "2026-10-19"
+    assert past_days_needed(np.array(["NaT"], dtype="datetime64[D]"), today) == SPINUP_DAYS
+    assert past_days_needed(np.array(["2026-10-18"], dtype="datetime64[D]"), today) == SPINUP_DAYS
+    assert past_days_needed(np.array(["2026-08-20", "NaT"], dtype="datetime64[D]"), today) == 60
+    assert past_days_needed(np.array(["2025-01-01"], dtype="datetime64[D]"), today) == MAX_PAST_DAYS
+
+
+@pytest.fixture
+def open_meteo_stub():
+    """Sammelantworten (Liste je Koordinate) wie die Open-Meteo-API."""
+    requests_seen = []
+
+    def send(url, params=None, timeout=None, **kwargs):
+        requests_seen.append(params)
+        lats = params["latitude"].split(",")
+        days = [str(d) for d in _days("2026-10-01", params["past_days"] + 1)]
+        body = [
+            {"daily": {"time": days, "et0_fao_evapotranspiration": [1.0] * len(days), "precipitation_sum": [None] * len(days)}}
+            for _ in lats
+        ]
+        body = body[0] if len(body) == 1 else body
+        return replay._response(url, 200, {"Content-Type": "application/json"}, json.dumps(body).encode("utf-8"))
+
+    previous = scheduler.get_scheduler()
+    scheduler.set_scheduler(scheduler.RequestScheduler(send=send))
+    yield requests_seen
+    scheduler.set_scheduler(previous)
+
+
+@pytest.mark.parametrize("n_sites", [1, 3])
+def test_fetch_daily_batches_coordinates(open_meteo_stub, n_sites):
+    dates, et0, rain = fetch_daily(np.arange(n_sites) + 0.5, np.arange(n_sites) + 10.0, past_days=5)
+
+    assert open_meteo_stub[0]["latitude"] == ",".join(f"{v + 0.5:.4f}" for v in range(n_sites))
+    assert dates.shape == et0.shape == rain.shape == (n_sites, 5)  # heute verworfen
+    assert str(dates[0, -1]) == "2026-10-05"
+    assert np.isnan(rain).all()
@@ -0,0 +1,178 @@
+"""
+Bodenwasserbilanz (Bucket-Modell) als mehrtägiger Dürreindikator.
+
+Jeder Standort hat einen Bodenwasserspeicher mit der Kapazität
+`soil_capacity_mm` seiner Klimazone. Pro Tag gilt:
+
+    AET = ET₀ · S / C                (Verdunstung sinkt mit dem Füllstand)
+    S   = clip(S + Regen − AET, 0, C) (Überschuss fließt ab)
+
+Der Zustand (Füllstand + letzter verarbeiteter Tag) wird gespeichert und
+bei jedem Lauf nur um neue Tage fortgeschrieben – vektorisiert über alle
+Standorte, ohne die Historie neu zu rechnen.
+
+Aufruf (alle Standorte aktualisieren):
+    python water_balance.py
+"""
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+
+from indicators import BATCH_SIZE, batch_matrix, fetch_batch
+from sites import load_registry
+
+STATE_FILE = Path(os.environ.get("NIKKI_WATER_BALANCE", Path(__file__).with_name("data") / "water_balance.npz"))
+SPINUP_DAYS = 30     # Tage Vorlauf für neue Standorte / Lücken
+MAX_PAST_DAYS = 92   # Open-Meteo-Grenze für past_days
+
+NO_DATE = np.datetime64("NaT", "D")
+
+
+class WaterBalanceState:
+    """Füllstand (mm) und letzter verarbeiteter Tag je Standort des Registers."""
+
+    def __init__(self, registry=None, storage=None, last_date=None):
+        self.registry = registry or load_registry()
+        self.capacity = self.registry.threshold("soil_capacity_mm").astype(np.float64)
+        n = len(self.registry)
+        self.storage = self.capacity.copy() if storage is None else storage
+        self.last_date = np.full(n, NO_DATE) if last_date is None else last_date
+
+    @property
+    def deficit_mm(self):
+        return self.capacity - self.storage
+
+    @property
+    def relative_deficit(self):
+        """0 = Speicher voll, 1 = Speicher leer."""
+        return 1.0 - self.storage / self.capacity
+
+    def update(self, idx, dates, et0, rain):
+        """
+        Neue Tage einarbeiten. `dates`, `et0`, `rain` sind Matrizen
+        (Standorte `idx` × Tage); bereits verarbeitete Tage werden übersprungen.
+        Fehlen zwischen dem letzten verarbeiteten und dem ersten gelieferten
+        Tag Daten, startet der Standort neu (voller Speicher, Vorlauf aus den
+        gelieferten Tagen). Liefert die Anzahl angewendeter Standort-Tage.
+        """
+        idx = np.asarray(idx)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        et0 = np.nan_to_num(np.asarray(et0, dtype=np.float64))
+        rain = np.nan_to_num(np.asarray(rain, dtype=np.float64))
+
+        cap = self.capacity[idx]
+        last = self.last_date[idx]
+        gap = ~np.isnat(last) & (last < dates[:, 0] - np.timedelta64(1, "D"))
+        storage = np.where(gap, cap, self.storage[idx])
+        last = np.where(gap, NO_DATE, last)
+        applied = 0
+        for j in range(dates.shape[1]):
+            new = np.isnat(last) | (dates[:, j] > last)
+            if not new.any():
+                continue
+            aet = et0[:, j] * storage / cap
+            step = np.clip(storage + rain[:, j] - aet, 0.0, cap)
+            storage = np.where(new, step, storage)
+            last = np.where(new, dates[:, j], last)
+            applied += int(new.sum())
+
+        self.storage[idx] = storage
+        self.last_date[idx] = last
+        return applied
+
+    def site_status(self, site_id):
+        """(Füllstand mm, Kapazität mm, relatives Defizit, letzter Tag) oder None."""
+        i = self.registry.index(site_id)
+        if np.isnat(self.last_date[i]):
+            return None
+        return (
+            float(self.storage[i]),
+            float(self.capacity[i]),
+            float(self.relative_deficit[i]),
+            str(self.last_date[i]),
+        )
+
+    # --- Persistenz -----------------------------------------------------
+    def save(self, path=STATE_FILE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, ids=self.registry.ids.astype(str), storage=self.storage, last_date=self.last_date)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=STATE_FILE, registry=None):
+        """Gespeicherten Zustand laden; neue Standorte starten mit vollem Speicher."""
+        state = cls(registry)
+        path = Path(path)
+        if not path.exists():
+            return state
+        with np.load(path) as f:
+            for site_id, s, d in zip(f["ids"], f["storage"], f["last_date"]):
+                if site_id in state.registry:
+                    i = state.registry.index(site_id)
+                    state.storage[i] = min(s, state.capacity[i])
+                    state.last_date[i] = d
+        return state
+
+
+# -----------------------------------------------------------
+# DATEN & LAUF
+# -----------------------------------------------------------
+def fetch_daily(lats, lons, past_days=SPINUP_DAYS):
+    """
+    Tägliche ET₀- und Regensummen (nur abgeschlossene Tage, lokale Zeit).
+    Liefert (Datumsmatrix, ET₀-Matrix, Regen-Matrix), Form Standort × Tag.
+    """
+    data = fetch_batch(lats, lons, {
+        "daily": "et0_fao_evapotranspiration,precipitation_sum",
+        "timezone": "auto",
+        "past_days": past_days,
+        "forecast_days": 1,
+    })
+    # Letzte Spalte = heute (unvollständig) → verwerfen
+    dates = batch_matrix(data, "daily", "time", "datetime64[D]")[:, :-1]
+    return dates, batch_matrix(data, "daily", "et0_fao_evapotranspiration")[:, :-1], batch_matrix(data, "daily", "precipitation_sum")[:, :-1]
+
+
+def past_days_needed(last_date, today=None):
+    """
+    Vorlauf einer Abfrage: mindestens `SPINUP_DAYS`, bei älterem Stand
+    bis zum ältesten letzten Tag zurück (höchstens `MAX_PAST_DAYS`;
+    längere Lücken setzt `update` zurück).
+    """
+    today = np.datetime64(today or "today", "D")
+    known = last_date[~np.isnat(last_date)]
+    if known.size == 0:
+        return SPINUP_DAYS
+    gap = int((today - known.min()).astype(np.int64))
+    return int(np.clip(gap, SPINUP_DAYS, MAX_PAST_DAYS))
+
+
+def update_all(state=None, chunk_size=BATCH_SIZE, fetch=fetch_daily):
+    """Alle Standorte des Registers um neue Tage fortschreiben."""
+    state = state or WaterBalanceState.load()
+    reg = state.registry
+    applied = 0
+    for start in range(0, len(reg), chunk_size):
+        idx = np.arange(start, min(start + chunk_size, len(reg)))
+        past_days = past_days_needed(state.last_date[idx])
+        dates, et0, rain = fetch(reg.lat[idx], reg.lon[idx], past_days=past_days)
+        applied += state.update(idx, dates, et0, rain)
+    return state, applied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bodenwasserbilanz aller Standorte fortschreiben.")
+    parser.add_argument("--state", default=STATE_FILE)
+    args = parser.parse_args()
+
+    state, applied = update_all(WaterBalanceState.load(args.state))
+    state.save(args.state)
+    print(f"{applied} Standort-Tage verarbeitet.")
+    for site_id in state.registry.ids:
+        status = state.site_status(site_id)
+        if status:
+            print(f"{site_id}: {status[0]:.0f}/{status[1]:.0f} mm (Defizit {status[2]:.0%}, Stand {status[3]})")